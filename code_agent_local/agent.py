@@ -3,49 +3,83 @@ Local Code Agent Monolithic Agent Definition
 Based on Google ADK's local code agent, supporting code planning, writing, file management, code execution and all other functions
 """
 
+import functools
+import inspect
 import logging
-from datetime import datetime
+import re
+import typing
+from datetime import datetime, timezone
 from typing import Dict, Any
+from uuid import uuid4
 
-from google.adk.agents import LlmAgent
-from google.adk.tools import ToolContext
 import json
-from .config import BASIC_MODEL, SYSTEM_NAME, MAX_ITERATIONS
-from .config import model_dict
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+from .config import SYSTEM_NAME, MAX_ITERATIONS
+from .config import PLAN_CACHE_ENABLED, PLAN_CACHE_DB, PLAN_CACHE_THRESHOLD, PLAN_CACHE_MIN_SUPPORT
+from .config import get_basic_model, get_model_dict
 
 # import litellm
 # litellm._turn_on_debug()
 
-# Apply MCP monkey patches in advance to ensure they take effect before Agent/tool creation
-try:
-    from mcp_retry_wrapper import apply_mcp_monkey_patches
-    _patch_info = apply_mcp_monkey_patches()
-    logging.getLogger(__name__).info(f"MCP monkey patch result (agent stage): {_patch_info}")
-except Exception as _agent_patch_err:
-    logging.getLogger(__name__).warning(f"MCP monkey patch application failed at agent stage: {_agent_patch_err}")
-
-from .mcp_tools import (
-    exit_loop, list_workspace,
-    read_file, write_file, delete_file, execute_python_code, 
-    run_system_command, 
-    start_interative_shell, run_interactive_shell, kill_shell_session,
-    safe_commands
-)
+_patched = False
+
+
+def _ensure_mcp_patched():
+    """Apply MCP monkey patches once, before the first Agent/tool creation"""
+    global _patched
+    if _patched:
+        return
+    _patched = True
+    from .mcp_tools import apply_json_fix
+    apply_json_fix()
+    try:
+        from mcp_retry_wrapper import apply_mcp_monkey_patches
+        _patch_info = apply_mcp_monkey_patches()
+        logging.getLogger(__name__).info("MCP monkey patch result (agent stage): %s", _patch_info)
+    except Exception as _agent_patch_err:
+        logging.getLogger(__name__).warning("MCP monkey patch application failed at agent stage: %s", _agent_patch_err)
+
 
 # import litellm
 # litellm._turn_on_debug()
 
-ALL_TOOLS = [
-    exit_loop,
-    list_workspace,
-    read_file,
-    write_file,
-    delete_file,
-    run_system_command,
-    start_interative_shell,
-    run_interactive_shell,
-    kill_shell_session,
-]
+
+@functools.cache
+def _all_tools() -> tuple:
+    """Tool functions exposed to the agent, imported on first use so that
+    importing this module does not pull in the MCP tool stack"""
+    from .mcp_tools import (
+        exit_loop, list_workspace,
+        read_file, write_file, delete_file,
+        run_system_command,
+        start_interative_shell, run_interactive_shell, kill_shell_session,
+    )
+    return (
+        exit_loop,
+        list_workspace,
+        read_file,
+        write_file,
+        delete_file,
+        run_system_command,
+        start_interative_shell,
+        run_interactive_shell,
+        kill_shell_session,
+    )
+
+
+@functools.cache
+def _tool_by_name() -> Dict[str, Any]:
+    return {tool.__name__: tool for tool in _all_tools()}
+
+_UTC = timezone.utc
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO-8601 string (millisecond precision)"""
+    return datetime.now(_UTC).isoformat(timespec='milliseconds')
 
 # Configure logging
 logging.basicConfig(
@@ -54,128 +88,62 @@ logging.basicConfig(
 )
 
 
-tool_descriptions = [
-    {
-        'name': "read_file",
-        'description': "read a file",
-        'parameters': {
-            'file_path': {
-                "type": "STRING",
-                "description": "absolute path of the file to read"
-            }
-        }
-    },
-    {
-        'name': "write_file",
-        'description': "write a file",
-        'parameters': {
-            'file_path': {
-                "type": "STRING",
-                "description": "absolute path of the file to write"
-            },
-            'content': {
-                "type": "STRING",
-                "description": "content to write to the file"
-            }
-        }
-    },
-    {
-        'name': "list_workspace",
-        'description': "list file in the workspace",
-        'parameters': {
-            'workspace_name': {
-                "type": "STRING",
-                "description": "The absolute path to the directory to list (must be absolute, not relative)"
-            }
-        }
-    },
-    {
-        'name': "delete_file",
-        'description': "delete a file",
-        'parameters': {
-            'file_path': {
-                "type": "STRING",
-                "description": "absolute path of the file to delete"
-            }
-        }
-    },
-    {
-        'name': "run_system_command",
-        'description': "run a system command (only for ['ls', 'pwd', 'echo', 'cat', 'head', 'tail', 'grep', 'find', 'python', 'python3', 'chmod', 'cd', 'pytest'])",
-        'parameters': {
-            'command': {
-                "type": "STRING",
-                "description": "system command to run"
-            }
-        }
-    },
-    {
-        'name': "start_interative_shell",
-        'description': "start a new shell session for interactive commands (only for ['ls', 'pwd', 'echo', 'cat', 'head', 'tail', 'grep', 'find', 'python', 'python3', 'chmod', 'cd', 'pytest']), and return the session_id.",
-        'parameters': {
-            'cmd': {
-                "type": "STRING",
-                "description": "command to run in the shell"
-            }
-        }
-    },
-    {
-        'name': "run_interactive_shell",
-        'description': "run a command in the shell session",
+_JSON_TYPES = {str: "STRING", int: "INTEGER", float: "NUMBER", bool: "BOOLEAN", list: "ARRAY", dict: "OBJECT"}
+
+_ARG_LINE = re.compile(r'^\s*(\w+)(?:\s*\([^)]*\))?\s*:\s*(.+?)\s*$')
+
+
+def _py_to_json_type(annotation) -> str:
+    """Map a parameter annotation to the schema type name used in the prompt"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _py_to_json_type(args[0]) if len(args) == 1 else "STRING"
+    return _JSON_TYPES.get(origin or annotation, "STRING")
+
+
+def _docstring_args(doc: str) -> Dict[str, str]:
+    """Parse the 'Args:' section of a Google-style docstring into {name: description}"""
+    descriptions = {}
+    in_args = False
+    for line in doc.splitlines():
+        stripped = line.strip()
+        if stripped == "Args:":
+            in_args = True
+        elif in_args:
+            if not stripped or stripped.endswith(":") and " " not in stripped:
+                break
+            match = _ARG_LINE.match(line)
+            if match:
+                descriptions[match.group(1)] = match.group(2)
+    return descriptions
+
+
+def _describe(tool) -> Dict[str, Any]:
+    """Build the prompt schema entry for a tool from its signature and docstring"""
+    doc = inspect.cleandoc(tool.__doc__ or "")
+    arg_docs = _docstring_args(doc)
+    hints = typing.get_type_hints(tool)
+    return {
+        'name': tool.__name__,
+        'description': doc.splitlines()[0] if doc else "",
         'parameters': {
-            'session_id': {
-                "type": "STRING",
-                "description": "session id of the shell session"
-            },
-            'user_input': {
-                "type": "STRING",
-                "description": "user input to run in the shell"
-            }
-        }
-    },
-    {
-        'name': "kill_shell_session",
-        'description': "kill a shell session",
-        'parameters': {
-            'session_id': {
-                "type": "STRING",
-                "description": "session id of the shell session"
-            }
-        }
-    },
-    {
-        'name':'exit_loop',
-        'description':'call when you finish all the tasks',
-        'parameters':{}
+            name: {"type": _py_to_json_type(hints.get(name, str)), "description": arg_docs.get(name, "")}
+            for name in inspect.signature(tool).parameters
+            if name != 'tool_context'
+        },
     }
-]
-
-class LocalCodeAgentSystem:
-    """
-    Local Code Agent Monolithic System
-    """
-    def __init__(self, model_name: str=None):
-        self.logger = logging.getLogger(__name__)
-        self.logger.info(f"Initializing local code agent system, using model: {model_name}")
-        self.setup_agent(model_name)
 
-    def find_model_by_name(self, model_name: str):
-        # model_dict[model_name]._turn_on_debug()litellm._turn_on_debug()
-        return model_dict[model_name]
 
-    def setup_agent(self, model_name: str=None):
-        """Setup monolithic agent"""
-        model = self.find_model_by_name(model_name) if model_name else BASIC_MODEL
-        logging.info(f"Using model: {model}")
-        
-        # Initialize early stop state
-        self.early_stop_triggered = False
-        
-        self.agent = LlmAgent(
-            name="local_code_agent",
-            model=model,
-            instruction=(
-                f"""
+# The instruction is laid out from most to least stable so providers with
+# automatic prompt caching can reuse the longest possible prefix:
+#   1. prompt prefix - immutable mandates and guidelines
+#   2. tools block   - tool schema, changes only when the tool set changes
+#   3. _PROMPT_SUFFIX - closing reminders; anything session-specific (e.g. a
+#                       workspace path) belongs here
+# Never interpolate session state into the prefix or the tools block.
+_PROMPT_PREFIX_TEMPLATE = (
+    """
 You are an interactive code agent specializing in software engineering tasks. Your primary goal is to help users safely and efficiently, adhering strictly to the following instructions and utilizing your available tools.
 
 # Core Mandates
@@ -226,34 +194,113 @@ When requested to perform tasks like fixing bugs, adding features, refactoring,
 3. `write_file` must provide both file_path and content parameters.
 4. All string parameters must be enclosed in quotation marks.
 5. After the task is completed, call `exit_loop()`  .
-6. The commands supported by `run_interactive_shell` and `run_system_command` must start with one of the following: {str(safe_commands)}. After entering the python environment, you can perform various operations (according to the terminal prompt, not limited to the above commands).
-
-
-# Tools
-{json.dumps(tool_descriptions)}
+6. The commands supported by `run_interactive_shell` and `run_system_command` must start with one of the following: {safe_commands}. After entering the python environment, you can perform various operations (according to the terminal prompt, not limited to the above commands).
+7. Before issuing any new `read_file`, `list_workspace`, or `run_system_command`, inspect prior tool outputs in the conversation history and reuse their data when the parameters match. Only issue a new call when the data is unavailable or the parameters differ.
+8. When several tool calls do not depend on each other's results (e.g. reading multiple files), issue them together in a single response instead of one per turn.
+""".strip()
+)
 
+_PROMPT_SUFFIX = (
+    """
 # Final Reminders
 Your core function is efficient and safe assistance. Balance extreme conciseness with the crucial need for clarity, especially regarding safety and potential system modifications. Always prioritize user control and project conventions. Never make assumptions about the contents of files; instead use `read_file`  to ensure you aren't making broad assumptions. Finally, you are an agent - please keep going until the user's query is completely resolved.
 
 
 """.strip()
-            ),
-            tools=ALL_TOOLS,
-        )
+)
+
+
+
+@functools.cache
+def _system_instruction() -> str:
+    """Static system instruction, built once on first agent construction so
+    every agent shares a byte-identical prompt prefix (keeps provider-side
+    prompt caching effective)"""
+    from .mcp_tools import safe_commands
+
+    # Tool schema derived from the exposed tools so it cannot drift from the
+    # functions ADK actually calls
+    tool_descriptions = tuple(_describe(tool) for tool in _all_tools())
+    if orjson is not None:
+        tool_desc_json = orjson.dumps(tool_descriptions).decode()
+    else:
+        tool_desc_json = json.dumps(list(tool_descriptions), separators=(',', ':'), ensure_ascii=False)
+    prompt_prefix = _PROMPT_PREFIX_TEMPLATE.format(safe_commands=str(safe_commands))
+    tools_block = f"# Tools\n{tool_desc_json}"
+    return f"{prompt_prefix}\n\n\n{tools_block}\n\n{_PROMPT_SUFFIX}"
+
+# LlmAgent instances shared across LocalCodeAgentSystem objects, keyed by model name
+_AGENT_CACHE: Dict[str, Any] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_model(model_name: str):
+    # model_dict[model_name]._turn_on_debug()litellm._turn_on_debug()
+    return get_model_dict()[model_name]
+
+class LocalCodeAgentSystem:
+    """
+    Local Code Agent Monolithic System
+    """
+    def __init__(self, model_name: str=None):
+        self.logger = logging.getLogger(__name__)
+        self.logger.info("Initializing local code agent system, using model: %s", model_name)
+        _ensure_mcp_patched()
+        self.setup_agent(model_name)
+
+    def find_model_by_name(self, model_name: str):
+        return _resolve_model(model_name)
+
+    def setup_agent(self, model_name: str=None):
+        """Setup monolithic agent"""
+        from google.adk.agents import LlmAgent
+
+        # Initialize early stop state
+        self.early_stop_triggered = False
+
+        cache_key = model_name or 'default'
+        agent = _AGENT_CACHE.get(cache_key)
+        if agent is None:
+            model = self.find_model_by_name(model_name) if model_name else get_basic_model()
+            self.logger.info("Using model: %s", model)
+            callbacks = {}
+            if PLAN_CACHE_ENABLED:
+                from .plan_cache import PlanCache
+                plan_cache = PlanCache(PLAN_CACHE_DB, PLAN_CACHE_THRESHOLD, PLAN_CACHE_MIN_SUPPORT)
+                callbacks = {
+                    "before_model_callback": plan_cache.before_model_callback,
+                    "after_tool_callback": plan_cache.after_tool_callback,
+                }
+            agent = _AGENT_CACHE[cache_key] = LlmAgent(
+                name="local_code_agent",
+                model=model,
+                instruction=_system_instruction(),
+                tools=list(_all_tools()),
+                **callbacks,
+            )
+        else:
+            self.logger.info("Reusing cached agent for model: %s", cache_key)
+
+        self.agent = agent
         self.root_agent = self.agent
 
     def get_root_agent(self):
         return self.root_agent
 
+    @staticmethod
+    def resolve_tool(name: str):
+        """Look up a registered tool function by name, None if unknown"""
+        return _tool_by_name().get(name)
+
     def check_early_stop(self, response) -> bool:
         """Check if response contains early stop flag"""
-        if hasattr(response, 'custom_metadata') and response.custom_metadata:
-            if response.custom_metadata.get("early_stop"):
-                self.early_stop_triggered = True
-                self.logger.info("Early stop flag detected, setting stop state")
-                return True
+        custom_metadata = getattr(response, 'custom_metadata', None)
+        if custom_metadata and custom_metadata.get("early_stop"):
+            self.early_stop_triggered = True
+            self.logger.info("Early stop flag detected, setting stop state")
+            return True
         
-        if hasattr(response, 'error_code') and response.error_code == "TOKEN_LIMIT_EXCEEDED":
+        if getattr(response, 'error_code', None) == "TOKEN_LIMIT_EXCEEDED":
             self.early_stop_triggered = True
             self.logger.info("Token limit error detected, setting stop state")
             return True
@@ -269,9 +316,10 @@ Your core function is efficient and safe assistance. Balance extreme conciseness
         """Check if early stop has been triggered"""
         return getattr(self, 'early_stop_triggered', False)
 
-    def run(self, user_input: str) -> Dict[str, Any]:
+    async def run(self, user_input: str) -> Dict[str, Any]:
         try:
-            self.logger.info(f"Starting to process user input: {user_input}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Starting to process user input: %s", user_input)
             
             # Check if early stop flag exists
             if hasattr(self, 'early_stop_triggered') and self.early_stop_triggered:
@@ -281,13 +329,12 @@ Your core function is efficient and safe assistance. Balance extreme conciseness
                     "reason": "Early stop triggered",
                     "user_input": user_input,
                     "response": "Token usage has reached the limit, session stopped",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": _now_iso()
                 }
             
             # Generate session_id
-            import uuid
-            session_id = str(uuid.uuid4())
-            self.logger.info(f"Generated session_id: {session_id}")
+            session_id = uuid4().hex
+            self.logger.info("Generated session_id: %s", session_id)
             
             # Here should implement the actual agent running logic
             # Currently returning mock results
@@ -296,18 +343,19 @@ Your core function is efficient and safe assistance. Balance extreme conciseness
                 "user_input": user_input,
                 "response": f"Local Code Agent has received your request: {user_input}",
                 "session_id": session_id,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _now_iso()
             }
-            self.logger.info(f"Processing completed: {result}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Processing completed: %r", result)
             return result
             
         except Exception as e:
-            self.logger.error(f"Error occurred while processing user input: {e}")
+            self.logger.error("Error occurred while processing user input: %s", e)
             return {
                 "status": "error",
                 "user_input": user_input,
                 "error": str(e),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _now_iso()
             }
 
 # Create agent instance
@@ -327,16 +375,36 @@ def parse_sys_args(argv):
 
 model_name = parse_sys_args(sys.argv)
 
-local_code_agent_system = LocalCodeAgentSystem(model_name)
-
-# Export root agent
-root_agent = local_code_agent_system.get_root_agent()
 
-# Compatible with LoopAgent usage
-from google.adk.agents import LoopAgent
-code_agent = root_agent
-code_agent_loop = LoopAgent(
-    name="code_agent_loop",
-    sub_agents=[code_agent],
-    max_iterations=MAX_ITERATIONS,
-) 
\ No newline at end of file
+# The agent objects are built on first access rather than at import, so
+# re-imports (autoreload, multiprocessing spawn) and non-agent importers do not
+# re-create the LLM client and agents.
+@functools.cache
+def get_local_code_agent_system(model_name: str=None) -> LocalCodeAgentSystem:
+    return LocalCodeAgentSystem(model_name)
+
+
+@functools.cache
+def get_root_agent_and_loop(model_name: str=None):
+    """Return (root_agent, code_agent_loop) for the given model"""
+    from google.adk.agents import LoopAgent
+
+    root_agent = get_local_code_agent_system(model_name).get_root_agent()
+    # Compatible with LoopAgent usage
+    code_agent_loop = LoopAgent(
+        name="code_agent_loop",
+        sub_agents=[root_agent],
+        max_iterations=MAX_ITERATIONS,
+    )
+    return root_agent, code_agent_loop
+
+
+def __getattr__(name):
+    # Export root agent and loop lazily (ADK loads `root_agent` via getattr)
+    if name == 'local_code_agent_system':
+        return get_local_code_agent_system(model_name)
+    if name in ('root_agent', 'code_agent'):
+        return get_root_agent_and_loop(model_name)[0]
+    if name == 'code_agent_loop':
+        return get_root_agent_and_loop(model_name)[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
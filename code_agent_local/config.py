@@ -1,41 +1,60 @@
+import functools
+import logging
 import os
-import uuid
+from uuid import uuid4
 from datetime import datetime
-from google.adk.models.lite_llm import LiteLlm
-from lite_llm_wrapper import LiteLlmWithSleep
+
+logger = logging.getLogger(__name__)
 
 # IMPORTANT: Replace 'your-api-key-here' with your actual API keys
 # IMPORTANT: Replace 'https://api.example.com' with your actual API base URLs
 # For security reasons, never commit real API keys to version control
 
-MAX_TOKENS = int(32768)
+MAX_TOKENS = 32768
+
+# Replay the stored responses for byte-identical LLM requests instead of
+# sampling again; off by default, set CODE_AGENT_LLM_CACHE=1 to enable
+LLM_RESPONSE_CACHE = os.getenv('CODE_AGENT_LLM_CACHE', '0') == '1'
+
+# Model clients are built lazily: importing LiteLLM/ADK is expensive and only
+# needed once an agent is actually constructed.
+@functools.cache
+def get_model_dict():
+    """Named model configurations, keyed by lower-case model name"""
+    from lite_llm_wrapper import CachingLiteLlm
+
+    # Friday's models all start with openai
+    # api_key should not be leaked
+    return {
+        "gpt-5": CachingLiteLlm(
+            model="openai/gpt-5",
+            api_base='https://api.example.com/v1/openai/native',
+            api_key='your-api-key-here',
+            max_tokens_threshold=64000,
+            enable_compression=True,
+            temperature=0.1,
+            enable_response_cache=LLM_RESPONSE_CACHE,
+        )
+    }
+
+
+# Basic model configuration
+@functools.cache
+def get_basic_model():
+    """Default model used when no model name is configured"""
+    from lite_llm_wrapper import CachingLiteLlm
 
-# Friday's models all start with openai
-# api_key should not be leaked
-model_dict = {
-    "gpt-5": LiteLlmWithSleep(
-        model="openai/gpt-5",
+    return CachingLiteLlm(
+        model="openai/Doubao-Seed-1.6",
         api_base='https://api.example.com/v1/openai/native',
         api_key='your-api-key-here',
-        max_tokens_threshold=64000,
+        max_tokens_threshold=300,
+        # for debug 
         enable_compression=True,
-        temperature=0.1
+        max_total_tokens=2000,
+        temperature=0.6,
+        enable_response_cache=LLM_RESPONSE_CACHE,
     )
-}
-
-
-
-# Basic model configuration
-BASIC_MODEL = LiteLlmWithSleep(
-    model="openai/Doubao-Seed-1.6",
-    api_base='https://api.example.com/v1/openai/native',
-    api_key='your-api-key-here',
-    max_tokens_threshold=300,
-    # for debug 
-    enable_compression=True,
-    max_total_tokens=2000,
-    temperature=0.6
-)
 
 
 
@@ -44,15 +63,25 @@ BASIC_MODEL = LiteLlmWithSleep(
 def generate_execution_id():
     """Generate unique execution ID"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
+    unique_id = uuid4().hex[:8]
     return f"exec_{timestamp}_{unique_id}"
 
-# Current execution ID
-CURRENT_EXECUTION_ID = generate_execution_id()
+# Current execution ID, generated on first use (see get_current_execution_id)
+_CURRENT_EXECUTION_ID = None
+
+
+def get_current_execution_id():
+    """Execution ID of this process, generated on first call"""
+    global _CURRENT_EXECUTION_ID
+    if _CURRENT_EXECUTION_ID is None:
+        _CURRENT_EXECUTION_ID = generate_execution_id()
+        logger.debug("Current execution ID: %s", _CURRENT_EXECUTION_ID)
+    return _CURRENT_EXECUTION_ID
 
 # Local MCP server configuration
 PYTHON_INTERPRETER_MCP_URL = "http://localhost:8001/python-interpreter"
-FILE_OPERATIONS_MCP_URL = "http://localhost:8002/file-operations"
+# Served by the same mcp_servers.py application as the Python interpreter
+FILE_OPERATIONS_MCP_URL = "http://localhost:8001/file-operations"
 SYSTEM_OPERATIONS_MCP_URL = "http://localhost:8003/system-operations"
 
 # MCP connection configuration
@@ -71,10 +100,26 @@ if not os.path.isabs(WORKSPACE_DIR):
     WORKSPACE_DIR = os.path.abspath(WORKSPACE_DIR)
 
 # Security configuration
-ALLOWED_EXTENSIONS = ['.py', '.txt', '.md', '.json', '.yaml', '.yml', '.csv', '.sql']
+ALLOWED_EXTENSIONS = frozenset(('.py', '.txt', '.md', '.json', '.yaml', '.yml', '.csv', '.sql'))
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 SANDBOX_MODE = True
 
-print(f"🚀 Current execution ID: {CURRENT_EXECUTION_ID}")
-print(f"📁 Workspace path: {WORKSPACE_DIR}") 
-
+# Plan cache: replay confidently predicted tool calls instead of asking the LLM
+# example: export CODE_AGENT_PLAN_CACHE=1
+PLAN_CACHE_ENABLED = os.getenv('CODE_AGENT_PLAN_CACHE', '0') == '1'
+PLAN_CACHE_DB = os.getenv('CODE_AGENT_PLAN_CACHE_DB', os.path.expanduser('~/.code_agent_plan_cache.sqlite3'))
+PLAN_CACHE_THRESHOLD = 0.9
+PLAN_CACHE_MIN_SUPPORT = 5
+
+logger.debug("Workspace path: %s", WORKSPACE_DIR)
+
+
+def __getattr__(name):
+    # Backward compatible access to lazily built values
+    if name == 'CURRENT_EXECUTION_ID':
+        return get_current_execution_id()
+    if name == 'model_dict':
+        return get_model_dict()
+    if name == 'BASIC_MODEL':
+        return get_basic_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
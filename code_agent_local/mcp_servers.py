@@ -5,145 +5,419 @@ Provides Python interpreter, file operations and system operations services
 """
 
 import asyncio
+import codecs
 import json
 import logging
-import subprocess
-import tempfile
+import multiprocessing
 import os
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+import aiofiles
 import aiohttp
 from aiohttp import web
-import pexpect
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib codec
+    orjson = None
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (and unavailable on Windows)
+    uvloop = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Size of the thread pool behind asyncio.to_thread (path resolution, stat, mkdir,
+# aiofiles). This is a thread count, not a process count: code runs in the
+# separate PythonWorker pool. Unset or 0 keeps the asyncio default.
+MAX_WORKERS = int(os.getenv('CODE_AGENT_MAX_WORKERS', '0')) or None
+
+# Server processes sharing the port through SO_REUSEPORT; each one runs its own
+# event loop and interpreter pool, and the kernel spreads connections across them
+MCP_PROCESSES = int(os.getenv('CODE_AGENT_MCP_PROCESSES', '1'))
+
+# Largest request body aiohttp will buffer (JSON write_file included); bigger
+# files go through the streaming /file-operations/upload endpoint
+MAX_REQUEST_SIZE = int(os.getenv('CODE_AGENT_MAX_REQUEST_SIZE', str(10 * 1024 * 1024)))
+# Largest file /file-operations/upload accepts; it streams, so this bounds disk use, not memory
+MAX_UPLOAD_SIZE = int(os.getenv('CODE_AGENT_MAX_UPLOAD_SIZE', str(1024 * 1024 * 1024)))
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+# libuv-backed event loop when installed; the handlers are unchanged either way
+_run = uvloop.run if uvloop is not None else asyncio.run
+
+
+def _health_prefix(**fields: str) -> bytes:
+    """Pre-encoded health body up to the opening quote of its timestamp value"""
+    return json.dumps(fields, separators=(',', ':'))[:-1].encode() + b',"timestamp":"'
+
+
+def json_response(data: Any, status: int = 200) -> web.Response:
+    """web.json_response equivalent that encodes with orjson when available"""
+    if orjson is None:
+        return web.json_response(data, status=status)
+    return web.Response(body=orjson.dumps(data), status=status, content_type='application/json')
+
+
+try:
+    from .worker_bootstrap import WORKER_BOOTSTRAP as _WORKER_BOOTSTRAP
+except ImportError:  # run as a script from this directory
+    from worker_bootstrap import WORKER_BOOTSTRAP as _WORKER_BOOTSTRAP
+
+
+class PythonWorker:
+    """Long-lived Python interpreter that executes snippets sent over a pipe"""
+    
+    def __init__(self, proc):
+        self.proc = proc
+        self.executions = 0
+    
+    @classmethod
+    async def spawn(cls):
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, '-c', _WORKER_BOOTSTRAP,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd='/tmp'
+        )
+        return cls(proc)
+    
+    async def run(self, code: str) -> Dict[str, Any]:
+        """Run one snippet and return its stdout, stderr and return code"""
+        data = code.encode('utf-8')
+        self.proc.stdin.write(b'%d\n' % len(data) + data)
+        await self.proc.stdin.drain()
+        header = await self.proc.stdout.readline()
+        if not header:
+            # The snippet ended the interpreter itself (os._exit, a crash); report
+            # its exit code like a one-shot run would
+            return_code = await self.proc.wait()
+            return {
+                'stdout': '',
+                'stderr': f'Python process exited unexpectedly with code {return_code}',
+                'return_code': return_code
+            }
+        payload = await self.proc.stdout.readexactly(int(header))
+        self.executions += 1
+        return json.loads(payload)
+    
+    async def kill(self):
+        if self.proc.returncode is None:
+            self.proc.kill()
+            await self.proc.wait()
+
+
 class PythonInterpreterMCP:
     """Python Interpreter MCP Server"""
     TIMEOUT = 10
+    # Warm interpreters kept ready for execute_code
+    POOL_SIZE = 4
+    # Recycle a worker after this many snippets to bound leaked state
+    MAX_EXECUTIONS_PER_WORKER = 100
+    # Interactive sessions: output chunks held between the interpreter and the
+    # socket, and bytes aiohttp buffers before send_str waits for a drain
+    WS_OUTPUT_QUEUE_SIZE = 64
+    WS_WRITER_LIMIT = 256 * 1024
+    # Output arriving within this window is coalesced into one frame, up to a size cap
+    WS_BATCH_SECONDS = 0.01
+    WS_BATCH_CHARS = 16 * 1024
+    # REPL output (prompts, tracebacks, indentation) deflates well; set
+    # CODE_AGENT_WS_COMPRESS=0 to save the per-connection zlib state instead
+    WS_COMPRESS = os.getenv('CODE_AGENT_WS_COMPRESS', '1') != '0'
+    WS_MAX_MSG_SIZE = 4 * 1024 * 1024
     
     def __init__(self, port: int = 8001):
         self.port = port
-        self.app = web.Application()
-        self.setup_routes()
+        self.worker_queue: asyncio.Queue = asyncio.Queue()
+        # Workers taken out of the queue (running a snippet or being replaced)
+        # and in-flight _replace_worker tasks, so shutdown can reach both
+        self._busy_workers: set = set()
+        self._bg_tasks: set = set()
+        self._closing = False
+        self._health_prefix = _health_prefix(status='healthy', service='python-interpreter')
+    
+    async def _start_workers(self, app):
+        """Pre-spawn the interpreter pool"""
+        for _ in range(self.POOL_SIZE):
+            self.worker_queue.put_nowait(await PythonWorker.spawn())
+        logger.info(f"Started {self.POOL_SIZE} Python workers")
     
-    def setup_routes(self):
-        """Setup routes"""
-        self.app.router.add_post('/python-interpreter/execute', self.execute_code)
-        self.app.router.add_get('/python-interpreter/health', self.health_check)
-        self.app.router.add_get('/python-interpreter/interactive', self.interactive_execute_code)
+    async def _stop_workers(self, app):
+        """Stop respawns, then kill checked-out and idle workers"""
+        self._closing = True
+        for task in self._bg_tasks:
+            task.cancel()
+        await asyncio.gather(*self._bg_tasks, return_exceptions=True)
+        for worker in list(self._busy_workers):
+            await worker.kill()
+        self._busy_workers.clear()
+        while not self.worker_queue.empty():
+            await self.worker_queue.get_nowait().kill()
+    
+    def _schedule_replace(self, worker: PythonWorker):
+        task = asyncio.create_task(self._replace_worker(worker))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+    
+    async def _replace_worker(self, worker: PythonWorker):
+        """Kill a worker and put a fresh one in the pool"""
+        await worker.kill()
+        self._busy_workers.discard(worker)
+        if self._closing:
+            return
+        try:
+            self.worker_queue.put_nowait(await PythonWorker.spawn())
+        except Exception as e:
+            logger.error(f"Failed to respawn Python worker: {e}")
+    
+    async def _run_once(self, code: str, timeout: float) -> Dict[str, Any]:
+        """Run code in a one-shot interpreter; raises asyncio.TimeoutError past the deadline"""
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, '-',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd='/tmp'
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(code.encode('utf-8')), timeout=timeout)
+        except BaseException:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+            raise
+        return {
+            'stdout': stdout.decode('utf-8', errors='replace'),
+            'stderr': stderr.decode('utf-8', errors='replace'),
+            'return_code': proc.returncode
+        }
+    
+    def register_routes(self, app: web.Application):
+        """Attach routes and worker-pool lifecycle hooks to an application"""
+        app.on_startup.append(self._start_workers)
+        app.on_cleanup.append(self._stop_workers)
+        app.router.add_post('/python-interpreter/execute', self.execute_code)
+        app.router.add_get('/python-interpreter/health', self.health_check)
+        app.router.add_get('/python-interpreter/interactive', self.interactive_execute_code)
     
     async def execute_code(self, request):
         """Execute Python code"""
         try:
-            data = await request.json()
+            data = await request.json(loads=_json_loads)
             code = data.get('code', '')
             timeout = data.get('timeout', self.TIMEOUT)
             
             logger.info(f"Executing Python code: {code[:100]}...")
             
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(code)
-                temp_file = f.name
+            # Execute code on a warm interpreter from the pool. When every worker
+            # is busy (or a respawn failed), run it in its own process rather than
+            # waiting for one. os._exit() would take a worker down, so such code
+            # also gets its own process; this is a best-effort substring check,
+            # and a worker that exits anyway still reports the exit code
+            worker = None
+            if '_exit' not in code:
+                try:
+                    worker = self.worker_queue.get_nowait()
+                    self._busy_workers.add(worker)
+                except asyncio.QueueEmpty:
+                    pass
+            if worker is None:
+                result = await self._run_once(code, timeout)
+            else:
+                healthy = False
+                try:
+                    result = await asyncio.wait_for(worker.run(code), timeout=timeout)
+                    healthy = worker.proc.returncode is None
+                finally:
+                    # Timed out, exited or cancelled workers are in an unknown
+                    # state; replace them, as well as workers that reached their
+                    # execution budget. A worker being replaced stays in
+                    # _busy_workers until it is dead
+                    if healthy and not self._closing and worker.executions < self.MAX_EXECUTIONS_PER_WORKER:
+                        self._busy_workers.discard(worker)
+                        self.worker_queue.put_nowait(worker)
+                    else:
+                        self._schedule_replace(worker)
             
-            try:
-                # Execute code
-                result = subprocess.run(
-                    [sys.executable, temp_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    cwd='/tmp'
-                )
-                
-                response_data = {
-                    'status': 'success',
-                    'stdout': result.stdout,
-                    'stderr': result.stderr,
-                    'return_code': result.returncode,
-                    'execution_time': datetime.now().isoformat()
-                }
-                
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file)
-            
-            return web.json_response(response_data)
-            
-        except subprocess.TimeoutExpired:
-            return web.json_response({
+            response_data = {
+                'status': 'success',
+                'stdout': result['stdout'],
+                'stderr': result['stderr'],
+                'return_code': result['return_code'],
+                'execution_time': datetime.now().isoformat()
+            }
+            
+            return json_response(response_data)
+            
+        except asyncio.TimeoutError:
+            return json_response({
                 'status': 'error',
                 'error': 'Code execution timeout'
             }, status=408)
         except Exception as e:
             logger.error(f"Code execution error: {e}")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'error': str(e)
             }, status=500)
     
     async def health_check(self, request):
         """Health check"""
-        return web.json_response({
-            'status': 'healthy',
-            'service': 'python-interpreter',
-            'timestamp': datetime.now().isoformat()
-        })
+        # Only the timestamp changes between probes
+        return web.Response(body=self._health_prefix + datetime.now().isoformat().encode() + b'"}',
+                            content_type='application/json')
     
     async def interactive_execute_code(self, request):
         """Interactive Python code execution (WebSocket)"""
-        ws = web.WebSocketResponse()
+        ws = web.WebSocketResponse(compress=self.WS_COMPRESS, max_msg_size=self.WS_MAX_MSG_SIZE,
+                                   writer_limit=self.WS_WRITER_LIMIT)
         await ws.prepare(request)
 
-        # Start interactive Python process
-        child = pexpect.spawn(sys.executable, ['-i'], encoding='utf-8', timeout=None)
+        # Start interactive Python process; -i keeps the REPL (prompts go to
+        # stderr, merged here) even though stdin is a pipe, -u disables buffering
+        child = await asyncio.create_subprocess_exec(
+            sys.executable, '-i', '-u',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env={**os.environ, 'PYTHONUNBUFFERED': '1', 'PYTHONDONTWRITEBYTECODE': '1'},
+        )
+        # Bounded hand-off: when the client reads slowly, send_str blocks, the
+        # queue fills and the reader stops draining the pipe, which in turn
+        # pauses the interpreter instead of buffering its output in memory
+        output_queue: asyncio.Queue = asyncio.Queue(maxsize=self.WS_OUTPUT_QUEUE_SIZE)
 
         async def read_from_python():
-            """Background task: continuously read Python output and push to frontend"""
-            try:
-                while True:
-                    output = child.read_nonblocking(size=1024, timeout=1)
-                    if output:
-                        await ws.send_str(output)
-            except pexpect.exceptions.TIMEOUT:
-                pass
-            except pexpect.exceptions.EOF:
-                await ws.send_str('[Python process ended]')
-                await ws.close()
+            """Background task: continuously read Python output into the queue"""
+            # Incremental decoding keeps multi-byte characters split across reads intact
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            while True:
+                data = await child.stdout.read(4096)
+                if not data:
+                    await output_queue.put(None)
+                    return
+                output = decoder.decode(data)
+                if output:
+                    await output_queue.put(output)
+
+        async def send_to_frontend():
+            """Background task: forward queued output to the frontend in batched frames"""
+            loop = asyncio.get_running_loop()
+            ended = False
+            while not ended:
+                output = await output_queue.get()
+                batch, size = [], 0
+                deadline = loop.time() + self.WS_BATCH_SECONDS
+                while output is not None:
+                    batch.append(output)
+                    size += len(output)
+                    remaining = deadline - loop.time()
+                    if size >= self.WS_BATCH_CHARS or remaining <= 0:
+                        break
+                    try:
+                        output = await asyncio.wait_for(output_queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                ended = output is None
+                if batch:
+                    await ws.send_str(''.join(batch))
+            await ws.send_str('[Python process ended]')
+            await ws.close()
 
         reader_task = asyncio.create_task(read_from_python())
+        sender_task = asyncio.create_task(send_to_frontend())
 
         try:
             async for msg in ws:
                 if msg.type == web.WSMsgType.TEXT:
                     # User input, write to Python process
-                    child.sendline(msg.data)
+                    child.stdin.write(msg.data.encode('utf-8') + b'\n')
+                    await child.stdin.drain()
                 elif msg.type == web.WSMsgType.ERROR:
                     break
         finally:
             reader_task.cancel()
-            child.terminate(force=True)
+            sender_task.cancel()
+            if child.returncode is None:
+                # Give the REPL a moment to exit on SIGTERM before killing it
+                child.terminate()
+                try:
+                    await asyncio.wait_for(child.wait(), 2.0)
+                except asyncio.TimeoutError:
+                    child.kill()
+            await child.wait()
             await ws.close()
         return ws
     
     async def start(self):
-        """Start server"""
-        runner = web.AppRunner(self.app)
+        """Start this service alone on its own port"""
+        # Built here rather than in __init__: start_all_servers registers the
+        # service on a shared application and never needs one of its own
+        app = web.Application(client_max_size=MAX_REQUEST_SIZE)
+        self.register_routes(app)
+        runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, 'localhost', self.port)
         await site.start()
         logger.info(f"Python Interpreter MCP server started on port {self.port}")
         return runner
 
+def _is_within(path: str, root: str) -> bool:
+    """Whether normalized path is root or below it, compared by whole components"""
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+def _ensure_parent_dir(path: str):
+    """Create the directory that will hold path, if it has one"""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+def _mkstemp_beside(path: str):
+    """Create a uniquely named temporary file in path's directory, return (fd, temp_path)
+
+    mkstemp creates it 0600; it is widened to 0644 so the file that replaces
+    path is readable like one written by open()
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.upload-')
+    os.fchmod(fd, 0o644)
+    return fd, tmp_path
+
+def _remove_if_exists(path: str):
+    """Delete path, ignoring a file that is already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _scan_directory(path: str) -> List[Dict[str, Any]]:
+    """List a directory in one pass; DirEntry reuses the file type from readdir"""
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            is_file = entry.is_file()
+            files.append({
+                'name': entry.name,
+                'type': 'directory' if entry.is_dir() else 'file',
+                'size': entry.stat().st_size if is_file else None
+            })
+    return files
+
 class FileOperationsMCP:
     """File Operations MCP Server"""
     
+    # Bytes per socket write when streaming file contents
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # Chunk size FileResponse uses when sendfile is unavailable
+    FETCH_CHUNK_SIZE = 256 * 1024
+    
     def __init__(self, port: int = 8002, workspace_dir: str = None):
         self.port = port
         # Use environment variable if workspace_dir is not provided
@@ -151,57 +425,135 @@ class FileOperationsMCP:
             workspace_dir = os.getenv('CODE_AGENT_WORKSPACE_DIR', './working')
         self.workspace_dir = Path(workspace_dir)
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
-        
-        self.app = web.Application()
-        self.setup_routes()
+        # Lexical forms of the workspace (as given and symlink-free) for the
+        # syscall-free pre-check, and the real path for the final check
+        self._workspace_real = os.path.realpath(self.workspace_dir)
+        self._workspace_roots = (os.path.abspath(self.workspace_dir), self._workspace_real)
+        self._workspace_str = str(self.workspace_dir)
+        self._health_prefix = _health_prefix(status='healthy', service='file-operations',
+                                             workspace=self._workspace_str)
     
-    def setup_routes(self):
-        self.app.router.add_post('/file-operations/read', self.read_file)
-        self.app.router.add_post('/file-operations/write', self.write_file)
-        self.app.router.add_post('/file-operations/list', self.list_files)
-        self.app.router.add_get('/file-operations/health', self.health_check)
+    def register_routes(self, app: web.Application):
+        """Attach routes to an application"""
+        app.router.add_post('/file-operations/read', self.read_file)
+        app.router.add_post('/file-operations/stream', self.stream_file)
+        app.router.add_get('/file-operations/fetch', self.fetch_file)
+        app.router.add_post('/file-operations/write', self.write_file)
+        app.router.add_post('/file-operations/upload', self.upload_file)
+        app.router.add_post('/file-operations/list', self.list_files)
+        app.router.add_get('/file-operations/health', self.health_check)
     
     def validate_path(self, file_path: str) -> bool:
         """Validate if file path is safe"""
         try:
-            file_path = Path(file_path).resolve()
-            workspace_path = self.workspace_dir.resolve()
-            return str(file_path).startswith(str(workspace_path))
-        except:
+            # abspath normalizes '..' lexically, so escapes are rejected without touching the disk
+            path = os.path.abspath(file_path)
+            if not any(_is_within(path, root) for root in self._workspace_roots):
+                return False
+            # A symlinked component may still point outside; confirm on the real path
+            return _is_within(os.path.realpath(path), self._workspace_real)
+        except (OSError, TypeError, ValueError):
             return False
     
     async def read_file(self, request):
         """Read file"""
         try:
-            data = await request.json()
+            data = await request.json(loads=_json_loads)
             file_path = data.get('path', '')
             
-            if not self.validate_path(file_path):
-                return web.json_response({
+            if not await asyncio.to_thread(self.validate_path, file_path):
+                return json_response({
                     'status': 'error',
                     'error': 'File path is not safe'
                 }, status=403)
             
-            file_path = Path(file_path)
-            if not file_path.exists():
-                return web.json_response({
+            if not await asyncio.to_thread(os.path.exists, file_path):
+                return json_response({
                     'status': 'error',
                     'error': 'File does not exist'
                 }, status=404)
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Clients asking for raw bytes get the sendfile path instead of JSON
+            if 'application/octet-stream' in request.headers.get('Accept', ''):
+                return web.FileResponse(path=file_path, chunk_size=self.FETCH_CHUNK_SIZE)
             
-            return web.json_response({
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                content = await f.read()
+            
+            return json_response({
                 'status': 'success',
                 'content': content,
                 'size': len(content),
-                'path': str(file_path)
+                'path': file_path
             })
             
         except Exception as e:
             logger.error(f"Read file error: {e}")
-            return web.json_response({
+            return json_response({
+                'status': 'error',
+                'error': str(e)
+            }, status=500)
+    
+    async def fetch_file(self, request):
+        """Send ?path=... as raw bytes; aiohttp uses zero-copy sendfile where available"""
+        file_path = request.query.get('path', '')
+        
+        if not await asyncio.to_thread(self.validate_path, file_path):
+            return json_response({
+                'status': 'error',
+                'error': 'File path is not safe'
+            }, status=403)
+        
+        if not await asyncio.to_thread(os.path.isfile, file_path):
+            return json_response({
+                'status': 'error',
+                'error': 'File does not exist'
+            }, status=404)
+        
+        return web.FileResponse(path=file_path, chunk_size=self.FETCH_CHUNK_SIZE)
+    
+    async def stream_file(self, request):
+        """Stream raw file bytes without buffering the whole file"""
+        response = None
+        try:
+            data = await request.json(loads=_json_loads)
+            file_path = data.get('path', '')
+            
+            if not await asyncio.to_thread(self.validate_path, file_path):
+                return json_response({
+                    'status': 'error',
+                    'error': 'File path is not safe'
+                }, status=403)
+            
+            if not await asyncio.to_thread(os.path.isfile, file_path):
+                return json_response({
+                    'status': 'error',
+                    'error': 'File does not exist'
+                }, status=404)
+            
+            size = (await asyncio.to_thread(os.stat, file_path)).st_size
+            response = web.StreamResponse(headers={'Content-Type': 'application/octet-stream'})
+            response.content_length = size
+            await response.prepare(request)
+            
+            async with aiofiles.open(file_path, 'rb') as f:
+                while True:
+                    chunk = await f.read(self.STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    # write() waits while the transport buffer is full, so a slow
+                    # reader throttles us instead of piling the file up in memory
+                    await response.write(chunk)
+            
+            await response.write_eof()
+            return response
+            
+        except Exception as e:
+            logger.error(f"Stream file error: {e}")
+            if response is not None and response.prepared:
+                # Headers are already on the wire, so a JSON error can't follow
+                raise
+            return json_response({
                 'status': 'error',
                 'error': str(e)
             }, status=500)
@@ -209,31 +561,94 @@ class FileOperationsMCP:
     async def write_file(self, request):
         """Write file"""
         try:
-            data = await request.json()
+            data = await request.json(loads=_json_loads)
             file_path = data.get('path', '')
             content = data.get('content', '')
             
-            if not self.validate_path(file_path):
-                return web.json_response({
+            if not await asyncio.to_thread(self.validate_path, file_path):
+                return json_response({
                     'status': 'error',
                     'error': 'File path is not safe'
                 }, status=403)
             
-            file_path = Path(file_path)
-            file_path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(_ensure_parent_dir, file_path)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+                await f.write(content)
             
-            return web.json_response({
+            return json_response({
                 'status': 'success',
-                'path': str(file_path),
+                'path': file_path,
                 'size': len(content)
             })
             
+        except web.HTTPRequestEntityTooLarge:
+            return json_response({
+                'status': 'error',
+                'error': f'Request body exceeds {MAX_REQUEST_SIZE} bytes, use /file-operations/upload'
+            }, status=413)
         except Exception as e:
             logger.error(f"Write file error: {e}")
-            return web.json_response({
+            return json_response({
+                'status': 'error',
+                'error': str(e)
+            }, status=500)
+    
+    async def upload_file(self, request):
+        """Write the raw request body to ?path=... chunk by chunk"""
+        try:
+            file_path = request.query.get('path', '')
+            
+            if not await asyncio.to_thread(self.validate_path, file_path):
+                return json_response({
+                    'status': 'error',
+                    'error': 'File path is not safe'
+                }, status=403)
+            
+            if request.content_length is not None and request.content_length > MAX_UPLOAD_SIZE:
+                return json_response({
+                    'status': 'error',
+                    'error': f'Upload exceeds {MAX_UPLOAD_SIZE} bytes'
+                }, status=413)
+            
+            await asyncio.to_thread(_ensure_parent_dir, file_path)
+            
+            # Reading the body stream chunk by chunk (not request.read()) keeps
+            # memory at one chunk and lets TCP flow control pace the sender. The
+            # body goes to a temporary file that only replaces the target once
+            # complete, so a failed or aborted upload leaves the old file intact.
+            # The temp name is unique so concurrent uploads to one path cannot
+            # interleave their bytes in a shared file
+            fd, tmp_path = await asyncio.to_thread(_mkstemp_beside, file_path)
+            size = 0
+            try:
+                async with aiofiles.open(fd, 'wb') as f:
+                    async for chunk in request.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+                        size += len(chunk)
+                        # Chunked bodies carry no Content-Length, so the cap is also checked as data arrives
+                        if size > MAX_UPLOAD_SIZE:
+                            raise web.HTTPRequestEntityTooLarge(max_size=MAX_UPLOAD_SIZE, actual_size=size)
+                        await f.write(chunk)
+                await asyncio.to_thread(os.replace, tmp_path, file_path)
+            except BaseException:
+                # Also runs when the client disconnects and the handler is cancelled
+                await asyncio.to_thread(_remove_if_exists, tmp_path)
+                raise
+            
+            return json_response({
+                'status': 'success',
+                'path': file_path,
+                'size': size
+            })
+            
+        except web.HTTPRequestEntityTooLarge:
+            return json_response({
+                'status': 'error',
+                'error': f'Upload exceeds {MAX_UPLOAD_SIZE} bytes'
+            }, status=413)
+        except Exception as e:
+            logger.error(f"Upload file error: {e}")
+            return json_response({
                 'status': 'error',
                 'error': str(e)
             }, status=500)
@@ -241,75 +656,72 @@ class FileOperationsMCP:
     async def list_files(self, request):
         """List files"""
         try:
-            data = await request.json()
-            directory = data.get('directory', str(self.workspace_dir))
+            data = await request.json(loads=_json_loads)
+            directory = data.get('directory') or self._workspace_str
             
-            if not self.validate_path(directory):
-                return web.json_response({
+            if not await asyncio.to_thread(self.validate_path, directory):
+                return json_response({
                     'status': 'error',
                     'error': 'Directory path is not safe'
                 }, status=403)
             
-            directory = Path(directory)
-            if not directory.exists():
-                return web.json_response({
+            if not await asyncio.to_thread(os.path.exists, directory):
+                return json_response({
                     'status': 'error',
                     'error': 'Directory does not exist'
                 }, status=404)
             
-            files = []
-            for item in directory.iterdir():
-                file_info = {
-                    'name': item.name,
-                    'type': 'directory' if item.is_dir() else 'file',
-                    'size': item.stat().st_size if item.is_file() else None
-                }
-                files.append(file_info)
+            # One worker-thread hop for the whole listing keeps the loop free on large directories
+            files = await asyncio.to_thread(_scan_directory, directory)
             
-            return web.json_response({
+            return json_response({
                 'status': 'success',
                 'files': files,
-                'directory': str(directory)
+                'directory': directory
             })
             
         except Exception as e:
             logger.error(f"List files error: {e}")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'error': str(e)
             }, status=500)
     
     async def health_check(self, request):
         """Health check"""
-        return web.json_response({
-            'status': 'healthy',
-            'service': 'file-operations',
-            'workspace': str(self.workspace_dir),
-            'timestamp': datetime.now().isoformat()
-        })
+        # Only the timestamp changes between probes
+        return web.Response(body=self._health_prefix + datetime.now().isoformat().encode() + b'"}',
+                            content_type='application/json')
     
     async def start(self):
-        """Start server"""
-        runner = web.AppRunner(self.app)
+        """Start this service alone on its own port"""
+        app = web.Application(client_max_size=MAX_REQUEST_SIZE)
+        self.register_routes(app)
+        runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, 'localhost', self.port)
         await site.start()
         logger.info(f"File Operations MCP server started on port {self.port}")
         return runner
 
-async def start_all_servers():
-    """Start all MCP servers"""
-    servers = [
-        PythonInterpreterMCP(port=8001),
-        FileOperationsMCP(port=8002),
-    ]
-    
-    runners = []
-    for server in servers:
-        runner = await server.start()
-        runners.append(runner)
+async def _install_executor(app):
+    """Bound the default executor used for blocking file-system calls"""
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='mcp-io')
+    asyncio.get_running_loop().set_default_executor(executor)
+
+async def start_all_servers(port: int = 8001, reuse_port: bool = False):
+    """Start all MCP services on one application and port"""
+    # One listener and router for every service; paths stay prefixed per service
+    app = web.Application(client_max_size=MAX_REQUEST_SIZE)
+    app.on_startup.append(_install_executor)
+    for server in (PythonInterpreterMCP(port=port), FileOperationsMCP(port=port)):
+        server.register_routes(app)
     
-    logger.info("All MCP servers started")
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, 'localhost', port, reuse_port=reuse_port)
+    await site.start()
+    logger.info(f"All MCP servers started on port {port} (pid {os.getpid()})")
     
     try:
         # Keep servers running
@@ -317,9 +729,39 @@ async def start_all_servers():
             await asyncio.sleep(1)
     except KeyboardInterrupt:
         logger.info("Shutting down servers...")
-        for runner in runners:
-            await runner.cleanup()
+        await runner.cleanup()
         logger.info("All servers closed")
 
+def _serve_process(port: int):
+    """Entry point of one server process"""
+    try:
+        _run(start_all_servers(port, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+def run_server_processes(processes: int, port: int = 8001):
+    """Run several server processes on one port and restart any that exit"""
+    # spawn keeps children free of the parent's interpreter state
+    ctx = multiprocessing.get_context('spawn')
+    workers = [None] * processes
+    try:
+        while True:
+            for i, worker in enumerate(workers):
+                if worker is None or not worker.is_alive():
+                    if worker is not None:
+                        logger.warning(f"MCP server process {worker.pid} exited with {worker.exitcode}, restarting")
+                    workers[i] = ctx.Process(target=_serve_process, args=(port,))
+                    workers[i].start()
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Shutting down server processes...")
+        for worker in workers:
+            if worker is not None:
+                worker.terminate()
+                worker.join()
+
 if __name__ == "__main__":
-    asyncio.run(start_all_servers()) 
\ No newline at end of file
+    if MCP_PROCESSES > 1:
+        run_server_processes(MCP_PROCESSES)
+    else:
+        _run(start_all_servers())
\ No newline at end of file
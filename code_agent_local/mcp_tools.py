@@ -6,15 +6,45 @@ Provides Python interpreter, file operations and system operations functionality
 # JSON error fix patch
 import json
 import logging
+import re
+import shlex
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib parser
+    orjson = None
+
+# Bound once so the _safe_json_loads happy path skips the module attribute lookups
+_orjson_loads = orjson.loads if orjson is not None else None
+_OrjsonDecodeError = orjson.JSONDecodeError if orjson is not None else None
 
 logger_patch = logging.getLogger(__name__)
 
+# Trailing commas before a closing brace/bracket, compiled once for _fix_trailing_comma
+_TRAIL_OBJ = re.compile(r',\s*}')
+_TRAIL_ARR = re.compile(r',\s*]')
+# A double quote preceded by an even number of backslashes, i.e. not escaped
+_UNESCAPED_QUOTE = re.compile(r'(?<!\\)(?:\\\\)*"')
+_BRACE = re.compile(r'[{}]')
+
 def _safe_json_loads(json_str: str, fallback_value: dict = None) -> dict:
     """Safe JSON parsing with automatic fixing of common format errors"""
+    # Well-formed input is the common case, so it costs a single C call;
+    # orjson rejects blank strings, which are handled after it
+    if _orjson_loads is not None:
+        try:
+            return _orjson_loads(json_str)
+        except _OrjsonDecodeError:
+            # Retry with the stdlib parser: it accepts a few things orjson doesn't
+            # (NaN, huge ints) and its error messages drive the fixers below
+            pass
+    elif json_str == "{}":
+        # Argument-less tool calls arrive as "{}" (see the `or "{}"` at the call site)
+        return {}
     if fallback_value is None:
         fallback_value = {}
     
-    if not json_str or json_str.strip() == "":
+    # Only a string that starts with whitespace can be blank, so compact JSON skips the strip() copy
+    if not json_str or (json_str[0].isspace() and not json_str.strip()):
         return fallback_value
     
     try:
@@ -22,14 +52,14 @@ def _safe_json_loads(json_str: str, fallback_value: dict = None) -> dict:
     except json.JSONDecodeError as e:
         logger_patch.warning(f"JSON parsing error, attempting to fix: {e}")
         
-        # Try to fix common issues
-        fixed_attempts = [
-            _fix_unterminated_string(json_str),
-            _fix_trailing_comma(json_str),
-            _extract_partial_json(json_str),
-        ]
+        # Try to fix common issues; the quote scan only helps when the
+        # decoder actually ran off the end of a string
+        fixers = [_fix_trailing_comma, _extract_partial_json]
+        if e.msg.startswith('Unterminated string'):
+            fixers.insert(0, _fix_unterminated_string)
         
-        for fixed_json in fixed_attempts:
+        for fixer in fixers:
+            fixed_json = fixer(json_str)
             if fixed_json:
                 try:
                     result = json.loads(fixed_json)
@@ -43,23 +73,14 @@ def _safe_json_loads(json_str: str, fallback_value: dict = None) -> dict:
 
 def _fix_unterminated_string(json_str: str) -> str:
     """Fix unterminated strings"""
-    try:
-        if json_str.count('"') % 2 == 1:  # Odd number of quotes
-            return json_str + '"}'
-    except Exception:
-        pass
+    # Odd number of unescaped quotes; escaped ones (\") don't open or close strings
+    if sum(1 for _ in _UNESCAPED_QUOTE.finditer(json_str)) % 2 == 1:
+        return json_str + '"}'
     return None
 
 def _fix_trailing_comma(json_str: str) -> str:
     """Fix trailing commas"""
-    try:
-        import re
-        fixed = re.sub(r',\s*}', '}', json_str)
-        fixed = re.sub(r',\s*]', ']', fixed)
-        return fixed
-    except Exception:
-        pass
-    return None
+    return _TRAIL_ARR.sub(']', _TRAIL_OBJ.sub('}', json_str))
 
 def _extract_partial_json(json_str: str) -> str:
     """Extract partial valid JSON"""
@@ -68,14 +89,16 @@ def _extract_partial_json(json_str: str) -> str:
         if start == -1:
             return None
         
+        # The regex engine skips everything but braces in C, so the Python
+        # loop below only runs once per brace instead of once per character
         brace_count = 0
-        for i, char in enumerate(json_str[start:], start):
-            if char == '{':
+        for match in _BRACE.finditer(json_str, start):
+            if match.group() == '{':
                 brace_count += 1
-            elif char == '}':
+            else:
                 brace_count -= 1
                 if brace_count == 0:
-                    return json_str[start:i+1]
+                    return json_str[start:match.end()]
         
         if brace_count > 0:
             return json_str[start:] + '}' * brace_count
@@ -84,6 +107,54 @@ def _extract_partial_json(json_str: str) -> str:
     return None
 
 
+def _tool_arguments_valid(message) -> bool:
+    """Check that every function tool call carries arguments that parse as JSON"""
+    tool_calls = message.get("tool_calls", None)
+    if not tool_calls:
+        return True
+    loads = orjson.loads if orjson is not None else json.loads
+    try:
+        for tool_call in tool_calls:
+            if tool_call.type == "function":
+                loads(tool_call.function.arguments or "{}")
+    except (ValueError, TypeError, AttributeError):
+        # orjson.JSONDecodeError and json.JSONDecodeError are both ValueErrors
+        return False
+    return True
+
+def _fixed_generate_content_response(message, is_partial: bool = False):
+    """Fix version response generation"""
+    from google.genai import types
+    from google.adk.models.llm_response import LlmResponse
+    
+    parts = []
+    if message.get("content", None):
+        parts.append(types.Part.from_text(text=message.get("content")))
+
+    if message.get("tool_calls", None):
+        for tool_call in message.get("tool_calls"):
+            if tool_call.type == "function":
+                try:
+                    # Use safe JSON parsing
+                    args_json = _safe_json_loads(tool_call.function.arguments or "{}")
+                    part = types.Part.from_function_call(
+                        name=tool_call.function.name,
+                        args=args_json,
+                    )
+                    part.function_call.id = tool_call.id
+                    parts.append(part)
+                except Exception as func_error:
+                    logger_patch.error(f"Function call creation failed: {func_error}")
+             
+                    error_text = f"[Function call error: {tool_call.function.name}]"
+                    parts.append(types.Part.from_text(text=error_text))
+
+    return LlmResponse(
+        content=types.Content(role="model", parts=parts), 
+        partial=is_partial
+    )
+
+
 def apply_json_fix():
     """Apply JSON error fix patch to LiteLLM"""
     try:
@@ -97,58 +168,35 @@ def apply_json_fix():
             Patched function that handles all possible argument signatures.
             Uses *args and **kwargs to be compatible with any function signature.
             """
+            # Extract message from args or kwargs
+            message = None
+            is_partial = False
+            
+            if args:
+                message = args[0]
+                if len(args) > 1:
+                    is_partial = args[1]
+            elif 'message' in kwargs:
+                message = kwargs['message']
+                is_partial = kwargs.get('is_partial', False)
+            
+            # Known-bad tool arguments would only make the original raise,
+            # so skip straight to the fix version instead of unwinding first
+            if message is not None and not _tool_arguments_valid(message):
+                logger_patch.warning("Detected malformed tool call arguments, using fix version")
+                return _fixed_generate_content_response(message, is_partial)
+            
             try:
                 # Try calling the original function with all arguments
                 return original_function(*args, **kwargs)
             except (json.JSONDecodeError, TypeError, ValueError) as e:
                 logger_patch.warning(f"Detected error in _message_to_generate_content_response, using fix version: {e}")
                 
-                # Extract message from args or kwargs
-                message = None
-                is_partial = False
-                
-                if args:
-                    message = args[0]
-                    if len(args) > 1:
-                        is_partial = args[1]
-                elif 'message' in kwargs:
-                    message = kwargs['message']
-                    is_partial = kwargs.get('is_partial', False)
-                
                 if message is None:
                     # If we can't extract message, re-raise the original error
                     raise e
                 
-                # Fix version response generation
-                from google.genai import types
-                from google.adk.models.llm_response import LlmResponse
-                
-                parts = []
-                if message.get("content", None):
-                    parts.append(types.Part.from_text(text=message.get("content")))
-
-                if message.get("tool_calls", None):
-                    for tool_call in message.get("tool_calls"):
-                        if tool_call.type == "function":
-                            try:
-                                # Use safe JSON parsing
-                                args_json = _safe_json_loads(tool_call.function.arguments or "{}")
-                                part = types.Part.from_function_call(
-                                    name=tool_call.function.name,
-                                    args=args_json,
-                                )
-                                part.function_call.id = tool_call.id
-                                parts.append(part)
-                            except Exception as func_error:
-                                logger_patch.error(f"Function call creation failed: {func_error}")
-                         
-                                error_text = f"[Function call error: {tool_call.function.name}]"
-                                parts.append(types.Part.from_text(text=error_text))
-
-                return LlmResponse(
-                    content=types.Content(role="model", parts=parts), 
-                    partial=is_partial
-                )
+                return _fixed_generate_content_response(message, is_partial)
         
         lite_llm_module._message_to_generate_content_response = patched_function
         logger_patch.info("✅ JSON error fix patch applied")
@@ -157,13 +205,16 @@ def apply_json_fix():
         logger_patch.warning(f"JSON fix patch application failed: {e}")
 
 
-apply_json_fix()
-
+import mmap
 import os
+import select
 import subprocess
-import tempfile
 import shutil
+import threading
+import time
+import venv
 from pathlib import Path
+from stat import S_ISDIR, S_ISREG
 from typing import Dict, List, Any, Optional
 from google.adk.tools import ToolContext
 try:
@@ -181,6 +232,15 @@ from code_agent_local.interative_shell import step, terminate
 
 logger = logging.getLogger(__name__)
 safe_commands = ['ls', 'pwd', 'echo', 'cat', 'head', 'tail', 'grep', 'find', 'python', 'python3', 'chmod', 'cd', 'lsof', 'mkdir']
+# Stricter list for interactive_system_command in sandbox mode
+interactive_safe_commands = ['ls', 'pwd', 'echo', 'cat', 'head', 'tail', 'grep', 'find', 'python', 'python3', 'lsof']
+
+def _command_prefix_re(commands: List[str]) -> re.Pattern:
+    """Match a command line whose program is one of commands (not merely containing it)"""
+    return re.compile(r'^\s*(?:' + '|'.join(map(re.escape, commands)) + r')(?=\s|$)')
+
+_SAFE_CMD_RE = _command_prefix_re(safe_commands)
+_INTERACTIVE_SAFE_CMD_RE = _command_prefix_re(interactive_safe_commands)
 
 from .config import (
     PYTHON_INTERPRETER_MCP_URL, 
@@ -191,17 +251,10 @@ from .config import (
     ALLOWED_EXTENSIONS,
     MAX_FILE_SIZE,
     SANDBOX_MODE,
-    CURRENT_EXECUTION_ID
+    get_current_execution_id
 )
 
 
-try:
-    from mcp_retry_wrapper import apply_mcp_monkey_patches
-    patch_info = apply_mcp_monkey_patches()
-    logger.info(f"MCP monkey patch results: {patch_info}")
-except Exception as _patch_err:
-    logger.warning(f"MCP monkey patch failed (does not affect running):{_patch_err}")
-
 # Data model definition
 class PythonCode(BaseModel):
     """Python code execution request"""
@@ -244,73 +297,21 @@ def exit_loop(tool_context: ToolContext):
         "stop_reason": "user_requested_exit"
     }
 
-def create_workspace(tool_context: ToolContext, workspace_name: Optional[str] = None, create_venv: bool = True):
-    """
-    Create workspace
-    
-    Args:
-        tool_context: Tool context
-        workspace_name: Workspace name, if None then use current execution ID
-        create_venv: Whether to create virtual environment, default True
-    
-    Returns:
-        dict: Dictionary with workspace information
-    """
-    if workspace_name is None:
-        workspace_name = CURRENT_EXECUTION_ID
-    
-    workspace_path = Path(WORKSPACE_DIR) / workspace_name
-    workspace_path.mkdir(parents=True, exist_ok=True)
-    
-    
-    (workspace_path / "src").mkdir(exist_ok=True)
-    (workspace_path / "tests").mkdir(exist_ok=True)
-    (workspace_path / "data").mkdir(exist_ok=True)
-    (workspace_path / "docs").mkdir(exist_ok=True)
-    
-    result = {
-        "workspace_path": str(workspace_path),
-        "workspace_name": workspace_name,
-        "status": "created",
-        "directories": ["src", "tests", "data", "docs"]
-    }
-    
+# Interpreter location inside a venv: Scripts/python.exe on Windows, bin/python elsewhere
+_VENV_PY_SUBPATH = ('Scripts', 'python.exe') if os.name == 'nt' else ('bin', 'python')
 
-    if create_venv:
-        try:
-            venv_path = workspace_path / "venv"
-            
-    
-            subprocess.run(
-                ['python', '-m', 'venv', str(venv_path)],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
- 
-            activate_script = workspace_path / "activate_venv.sh"
-            with open(activate_script, 'w', encoding='utf-8') as f:
-                f.write(f"""#!/bin/bash
+# Workspace skeleton files, encoded once at import
+_ACTIVATE_TEMPLATE = b"""#!/bin/bash
 # Activate virtual environment script
-echo "Activate virtual environment: {venv_path}"
-source "{venv_path}/bin/activate"
+echo "Activate virtual environment: {VENV}"
+source "{VENV}/bin/activate"
 echo "Virtual environment activated, Python path: $(which python)"
 echo "Current working directory: $(pwd)"
-""")
-            
-      
-            os.chmod(activate_script, 0o755)
-            
-            
-            requirements_file = workspace_path / "requirements.txt"
-            with open(requirements_file, 'w', encoding='utf-8') as f:
-                f.write("# Project dependencies\n# Example:\n# requests==2.31.0\n# pandas==2.0.3\n")
-            
+"""
 
-            gitignore_file = workspace_path / ".gitignore"
-            with open(gitignore_file, 'w', encoding='utf-8') as f:
-                f.write("""# Python
+_REQ_BYTES = b"# Project dependencies\n# Example:\n# requests==2.31.0\n# pandas==2.0.3\n"
+
+_GITIGNORE_BYTES = b"""# Python
 __pycache__/
 *.py[cod]
 *$py.class
@@ -353,7 +354,59 @@ Thumbs.db
 # Data files
 data/*.csv
 data/*.json
-""")
+"""
+
+def create_workspace(tool_context: ToolContext, workspace_name: Optional[str] = None, create_venv: bool = True):
+    """
+    Create workspace
+    
+    Args:
+        tool_context: Tool context
+        workspace_name: Workspace name, if None then use current execution ID
+        create_venv: Whether to create virtual environment, default True
+    
+    Returns:
+        dict: Dictionary with workspace information
+    """
+    if workspace_name is None:
+        workspace_name = get_current_execution_id()
+    
+    workspace_path = Path(WORKSPACE_DIR) / workspace_name
+    workspace_path.mkdir(parents=True, exist_ok=True)
+    _INTERPRETER_CACHE.pop(workspace_name, None)
+    
+    
+    (workspace_path / "src").mkdir(exist_ok=True)
+    (workspace_path / "tests").mkdir(exist_ok=True)
+    (workspace_path / "data").mkdir(exist_ok=True)
+    (workspace_path / "docs").mkdir(exist_ok=True)
+    
+    result = {
+        "workspace_path": str(workspace_path),
+        "workspace_name": workspace_name,
+        "status": "created",
+        "directories": ["src", "tests", "data", "docs"]
+    }
+    
+
+    if create_venv:
+        try:
+            venv_path = workspace_path / "venv"
+            
+            # Build the venv in-process instead of starting `python -m venv`; pip
+            # stays bundled because the agent installs packages into it right away
+            venv.EnvBuilder(with_pip=True, symlinks=os.name != 'nt').create(str(venv_path))
+            
+ 
+            activate_script = workspace_path / "activate_venv.sh"
+            activate_script.write_bytes(_ACTIVATE_TEMPLATE.replace(b'{VENV}', str(venv_path).encode('utf-8')))
+            os.chmod(activate_script, 0o755)
+            
+            requirements_file = workspace_path / "requirements.txt"
+            requirements_file.write_bytes(_REQ_BYTES)
+            
+            gitignore_file = workspace_path / ".gitignore"
+            gitignore_file.write_bytes(_GITIGNORE_BYTES)
             
             result.update({
                 "venv_created": True,
@@ -382,19 +435,47 @@ data/*.json
     
     return result
 
+def _walk_workspace(directory: str, prefix_len: int, files: List[Dict[str, Any]]):
+    """
+    Append the entries under directory in Path.rglob("*") order: a directory's
+    entries first, then each non-symlinked subdirectory in turn. Each entry is
+    classified from a single stat result rather than separate is_file/is_dir
+    calls; symlinks are followed, as is_file/is_dir do.
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError:  # unreadable or vanished, skipped like rglob does
+        return
+    subdirs = []
+    with entries:
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:  # dangling symlink or removed mid-walk
+                continue
+            mode = st.st_mode
+            if S_ISREG(mode):
+                files.append({"path": entry.path[prefix_len:], "size": st.st_size, "type": "file"})
+            elif S_ISDIR(mode):
+                files.append({"path": entry.path[prefix_len:], "type": "directory"})
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+    for subdir in subdirs:
+        _walk_workspace(subdir, prefix_len, files)
+
 def list_workspace(tool_context: ToolContext, workspace_name: Optional[str] = None):
     """
     List workspace content
     
     Args:
         tool_context: Tool context
-        workspace_name: Workspace name, if None then use current execution ID
+        workspace_name: Workspace name or absolute directory path, if None then use current execution ID
     
     Returns:
         dict: Dictionary with workspace file list
     """
     if workspace_name is None:
-        workspace_name = CURRENT_EXECUTION_ID
+        workspace_name = get_current_execution_id()
     
     workspace_path = Path(WORKSPACE_DIR) / workspace_name
     
@@ -402,18 +483,7 @@ def list_workspace(tool_context: ToolContext, workspace_name: Optional[str] = No
         return {"error": "Workspace does not exist"}
     
     files = []
-    for item in workspace_path.rglob("*"):
-        if item.is_file():
-            files.append({
-                "path": str(item.relative_to(workspace_path)),
-                "size": item.stat().st_size,
-                "type": "file"
-            })
-        elif item.is_dir():
-            files.append({
-                "path": str(item.relative_to(workspace_path)),
-                "type": "directory"
-            })
+    _walk_workspace(str(workspace_path), len(str(workspace_path)) + 1, files)
     
     return {
         "workspace_path": str(workspace_path),
@@ -421,6 +491,10 @@ def list_workspace(tool_context: ToolContext, workspace_name: Optional[str] = No
         "files": files
     }
 
+# Resolved once; the workspace root does not move while the agent runs
+_WORKSPACE_REAL = os.path.realpath(WORKSPACE_DIR)
+_WORKSPACE_PREFIX = os.path.join(_WORKSPACE_REAL, '')
+
 def validate_file_path(file_path: str) -> bool:
     """Validate file path is safe"""
     # tmp directory is not checked
@@ -428,16 +502,14 @@ def validate_file_path(file_path: str) -> bool:
         return True
     if SANDBOX_MODE:
         # In sandbox mode, only allow access to files in the workspace
-        workspace_path = Path(WORKSPACE_DIR).resolve()
-        file_path = Path(file_path).resolve()
-        
-        if not str(file_path).startswith(str(workspace_path)) or not str(file_path).startswith("/tmp"):
+        file_path = os.path.realpath(file_path)
+        if file_path != _WORKSPACE_REAL and not file_path.startswith(_WORKSPACE_PREFIX):
             return False
     # Check file extensions
-    if Path(file_path).suffix not in ALLOWED_EXTENSIONS:
-        return False
-    
-    return True
+    return os.path.splitext(file_path)[1] in ALLOWED_EXTENSIONS
+
+# Files at least this large are decoded from an mmap rather than read into memory first
+_MMAP_THRESHOLD = 64 * 1024
 
 def read_file(tool_context: ToolContext, file_path: str):
     """
@@ -445,7 +517,7 @@ def read_file(tool_context: ToolContext, file_path: str):
     
     Args:
         tool_context: Tool context
-        file_path: File path
+        file_path: Absolute path of the file to read
     
     Returns:
         dict: Dictionary with file content
@@ -458,16 +530,21 @@ def read_file(tool_context: ToolContext, file_path: str):
         if not file_path.exists():
             return {"error": "File does not exist"}
         
-        if file_path.stat().st_size > MAX_FILE_SIZE:
+        size = file_path.stat().st_size
+        if size > MAX_FILE_SIZE:
             return {"error": "File is too large"}
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if size < _MMAP_THRESHOLD:
+            content = file_path.read_bytes().decode('utf-8')
+        else:
+            # Decode straight out of the page cache instead of copying into a bytes object first
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                content = str(mm, 'utf-8')
         
         return {
             "file_path": str(file_path),
             "content": content,
-            "size": len(content)
+            "size": size
         }
     except Exception as e:
         return {"error": f"Failed to read file: {str(e)}"}
@@ -478,8 +555,8 @@ def write_file(tool_context: ToolContext, file_path: str, content: str):
     
     Args:
         tool_context: Tool context
-        file_path: File path (required)
-        content: Content to write (required)
+        file_path: Absolute path of the file to write (required)
+        content: Content to write to the file (required)
     
     Returns:
         dict: Dictionary with operation result
@@ -491,13 +568,14 @@ def write_file(tool_context: ToolContext, file_path: str, content: str):
         file_path = Path(file_path)
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Encode once and hand the kernel a single buffer, no text-IO wrapper stack
+        data = content.encode('utf-8')
+        file_path.write_bytes(data)
         
         return {
             "file_path": str(file_path),
             "status": "written",
-            "size": len(content)
+            "size": len(data)
         }
     except Exception as e:
         return {"error": f"Failed to write file: {str(e)}"}
@@ -508,7 +586,7 @@ def delete_file(tool_context: ToolContext, file_path: str):
     
     Args:
         tool_context: Tool context
-        file_path: File path
+        file_path: Absolute path of the file to delete
     
     Returns:
         dict: Dictionary with operation result
@@ -529,6 +607,35 @@ def delete_file(tool_context: ToolContext, file_path: str):
     except Exception as e:
         return {"error": f"Failed to delete file: {str(e)}"}
 
+# venv path -> (site-packages mtime, fetch time, `pip list` output)
+_PIP_LIST_CACHE: Dict[str, tuple] = {}
+# Re-run pip after this many seconds even if site-packages looks unchanged
+_PIP_LIST_TTL = 60
+
+def _site_packages_stamp(venv_path: Path) -> float:
+    """Latest mtime of the venv's site-packages dirs; installs and uninstalls bump it"""
+    dirs = list(venv_path.glob("lib/python*/site-packages")) + list(venv_path.glob("Lib/site-packages"))
+    return max((d.stat().st_mtime for d in dirs), default=0.0)
+
+def _pip_list(python_path: Path, venv_path: Path) -> str:
+    """`pip list` output for a venv, cached until its site-packages change"""
+    key = str(venv_path)
+    stamp = _site_packages_stamp(venv_path)
+    cached = _PIP_LIST_CACHE.get(key)
+    if cached and cached[0] == stamp and time.monotonic() - cached[1] < _PIP_LIST_TTL:
+        return cached[2]
+    
+    result = subprocess.run(
+        [str(python_path), '-m', 'pip', 'list'],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        return "Failed to get package list"
+    _PIP_LIST_CACHE[key] = (stamp, time.monotonic(), result.stdout)
+    return result.stdout
+
 def activate_venv(tool_context: ToolContext, workspace_name: Optional[str] = None):
     """
     Activate virtual environment of workspace
@@ -541,7 +648,7 @@ def activate_venv(tool_context: ToolContext, workspace_name: Optional[str] = Non
         dict: Dictionary with activation result
     """
     if workspace_name is None:
-        workspace_name = CURRENT_EXECUTION_ID
+        workspace_name = get_current_execution_id()
     
     workspace_path = Path(WORKSPACE_DIR) / workspace_name
     venv_path = workspace_path / "venv"
@@ -551,32 +658,123 @@ def activate_venv(tool_context: ToolContext, workspace_name: Optional[str] = Non
     
     try:
         # Get Python interpreter path of virtual environment
-        if os.name == 'nt':  # Windows
-            python_path = venv_path / "Scripts" / "python.exe"
-        else:  # Unix/Linux/macOS
-            python_path = venv_path / "bin" / "python"
+        python_path = venv_path.joinpath(*_VENV_PY_SUBPATH)
         
         if not python_path.exists():
             return {"error": "Virtual environment Python interpreter does not exist"}
 
-        result = subprocess.run(
-            [str(python_path), '-m', 'pip', 'list'],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        
         return {
             "workspace_name": workspace_name,
             "venv_path": str(venv_path),
             "python_path": str(python_path),
             "status": "activated",
-            "installed_packages": result.stdout if result.returncode == 0 else "Failed to get package list"
+            "installed_packages": _pip_list(python_path, venv_path)
         }
         
     except Exception as e:
         return {"error": f"Failed to activate virtual environment: {str(e)}"}
 
+from .worker_bootstrap import WORKER_BOOTSTRAP as _WORKER_BOOTSTRAP
+
+# Recycle a worker after this many snippets to bound state the reset misses
+_WORKER_MAX_EXECUTIONS = 100
+# Persistent workers need select() on pipes, which Windows lacks
+_WORKERS_SUPPORTED = os.name != 'nt'
+
+
+class _CodeWorker:
+    """Long-lived interpreter that runs execute_python_code snippets"""
+    
+    def __init__(self, python_executable: str):
+        self.proc = subprocess.Popen(
+            [python_executable, '-c', _WORKER_BOOTSTRAP],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=WORKSPACE_DIR,
+            bufsize=0
+        )
+        self.lock = threading.Lock()
+        self.executions = 0
+    
+    def run(self, code: str, timeout: float) -> Dict[str, Any]:
+        """Run one snippet; raises subprocess.TimeoutExpired past the deadline"""
+        data = code.encode('utf-8')
+        self.proc.stdin.write(b'%d\n' % len(data) + data)
+        self.executions += 1
+        
+        fd = self.proc.stdout.fileno()
+        buf = bytearray()
+        deadline = time.monotonic() + timeout
+        while True:
+            newline = buf.find(b'\n')
+            if newline != -1 and len(buf) - newline - 1 >= int(buf[:newline]):
+                return json.loads(bytes(buf[newline + 1:]))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise subprocess.TimeoutExpired(self.proc.args, timeout)
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return_code = self.proc.wait()
+                return {
+                    'stdout': '',
+                    'stderr': f'Python process exited unexpectedly with code {return_code}',
+                    'return_code': return_code
+                }
+            buf += chunk
+    
+    def kill(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+
+# python executable -> its persistent worker
+_WORKERS: Dict[str, _CodeWorker] = {}
+_WORKERS_LOCK = threading.Lock()
+
+def _run_in_worker(python_executable: str, code: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """Run code on the executable's persistent worker; None when the caller should spawn a process"""
+    with _WORKERS_LOCK:
+        worker = _WORKERS.get(python_executable)
+        if worker is None or worker.proc.poll() is not None:
+            if worker is not None:
+                worker.kill()  # already exited, just reap it
+            worker = _WORKERS[python_executable] = _CodeWorker(python_executable)
+    # A concurrent call already holds this worker; run it in its own process instead
+    if not worker.lock.acquire(blocking=False):
+        return None
+    retire = True
+    try:
+        result = worker.run(code, timeout)
+        retire = worker.executions >= _WORKER_MAX_EXECUTIONS or worker.proc.poll() is not None
+        return result
+    finally:
+        # Timeouts, broken protocol, crashes and exhausted workers are never handed out again
+        if retire:
+            with _WORKERS_LOCK:
+                if _WORKERS.get(python_executable) is worker:
+                    del _WORKERS[python_executable]
+            worker.kill()
+        worker.lock.release()
+
+# execution ID -> interpreter of that workspace's venv; only hits are cached, so
+# a venv created later is still found, and create_workspace drops stale entries
+_INTERPRETER_CACHE: Dict[str, str] = {}
+
+def _venv_python(workspace_name: str) -> Optional[str]:
+    """Python interpreter of the workspace's venv, or None if there is no usable one"""
+    cached = _INTERPRETER_CACHE.get(workspace_name)
+    if cached is not None:
+        return cached
+    venv_path = Path(WORKSPACE_DIR) / workspace_name / "venv"
+    python_path = venv_path.joinpath(*_VENV_PY_SUBPATH)
+    # One stat on the interpreter covers the venv directory check too
+    if not python_path.exists():
+        return None
+    _INTERPRETER_CACHE[workspace_name] = str(python_path)
+    return str(python_path)
+
 def execute_python_code(tool_context: ToolContext, code: str, timeout: int = 30, use_venv: bool = True):
     """
     Execute Python code
@@ -592,60 +790,88 @@ def execute_python_code(tool_context: ToolContext, code: str, timeout: int = 30,
     """
     try:
         # Determine the Python interpreter to use
-        if use_venv:
-            workspace_path = Path(WORKSPACE_DIR) / CURRENT_EXECUTION_ID
-            venv_path = workspace_path / "venv"
-            
-            if venv_path.exists():
-                if os.name == 'nt':  # Windows
-                    python_executable = str(venv_path / "Scripts" / "python.exe")
-                else:  # Unix/Linux/macOS
-                    python_executable = str(venv_path / "bin" / "python")
-                
-                if not Path(python_executable).exists():
-                    python_executable = 'python'  # Fall back to system Python
-            else:
-                python_executable = 'python'  # Fall back to system Python
-        else:
-            python_executable = 'python'
+        venv_python = _venv_python(get_current_execution_id()) if use_venv else None
+        python_executable = venv_python or 'python'  # Fall back to system Python
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
+        # os._exit() would take a persistent worker down with it, so such code gets
+        # its own process. This is a best-effort substring check: code that reaches
+        # os._exit some other way still gets its exit code reported, but loses its
+        # output, and the worker is replaced
+        if _WORKERS_SUPPORTED and '_exit' not in code:
+            worker_result = _run_in_worker(python_executable, code, timeout)
+            if worker_result is not None:
+                return {
+                    **worker_result,
+                    "execution_time": "completed",
+                    "python_executable": python_executable,
+                    "used_venv": venv_python is not None
+                }
         
-       
+        # One-shot interpreter reading the program from stdin; no temp file to create and unlink
         result = subprocess.run(
-            [python_executable, temp_file],
+            [python_executable, '-'],
+            input=code,
             capture_output=True,
             text=True,
             timeout=timeout,
             cwd=WORKSPACE_DIR
         )
         
-        os.unlink(temp_file)
-        
         return {
             "stdout": result.stdout,
             "stderr": result.stderr,
             "return_code": result.returncode,
             "execution_time": "completed",
             "python_executable": python_executable,
-            "used_venv": use_venv and venv_path.exists() if use_venv else False
+            "used_venv": venv_python is not None
         }
     except subprocess.TimeoutExpired:
         return {"error": "Code execution timed out"}
     except Exception as e:
         return {"error": f"Failed to execute code: {str(e)}"}
 
-def run_system_command(tool_context: ToolContext, command: str, timeout: int = 15):
+# Characters /bin/sh gives a meaning that shlex.split does not reproduce:
+# operators, redirections, expansions, globs, comments and tilde expansion.
+# Quotes and backslashes are left to shlex, which removes them the way sh does
+_SHELL_METACHARACTERS = frozenset('|&;<>()$`*?[]#~{}\n')
+_ASSIGNMENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*=')
+
+def _decode_output(data: bytes) -> str:
+    """Decode command output the way subprocess text mode does (universal newlines)"""
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+def _plain_argv(command: str) -> Optional[List[str]]:
+    """argv of command when exec'ing it gives the same result as sh -c, else None"""
+    if _SHELL_METACHARACTERS.intersection(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None  # unbalanced quotes: let sh report the syntax error
+    # Leading VAR=value assignments and the ! pipeline negation are shell syntax too
+    if not argv or argv[0] == '!' or _ASSIGNMENT.match(argv[0]):
+        return None
+    return argv
+
+async def _spawn_command(command: str):
+    """Start command, skipping the /bin/sh fork when it is a plain argv"""
+    pipes = dict(stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=WORKSPACE_DIR)
+    argv = _plain_argv(command)
+    if argv:
+        try:
+            return await asyncio.create_subprocess_exec(*argv, **pipes)
+        except FileNotFoundError:
+            pass  # shell builtin such as cd, or a missing program: let sh report it
+    return await asyncio.create_subprocess_shell(command, **pipes)
+
+async def run_system_command(tool_context: ToolContext, command: str, timeout: int = 15):
     """
     Run system command
     
     Args:
         tool_context: Tool context
         command: System command to execute
-        timeout: Execution timeout (seconds), default 30 seconds
+        timeout: Execution timeout (seconds), default 15 seconds
     
     Returns:
         dict: Dictionary with execution result
@@ -655,34 +881,84 @@ def run_system_command(tool_context: ToolContext, command: str, timeout: int = 1
 
     if SANDBOX_MODE:
             
-        if not any(cmd in command for cmd in safe_commands):
+        if not _SAFE_CMD_RE.match(command):
             return {"error": "The command you executed is not allowed in sandbox mode; safe command list: " + str(safe_commands)}
     try:
         logger.info(f"Running system command: {command}")
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=WORKSPACE_DIR
-        )
+        # Awaiting the process frees the event loop, so the agent's other tool calls keep running
+        proc = await _spawn_command(command)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return {"error": "Command execution timed out"}
         
         return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "return_code": result.returncode
+            "stdout": _decode_output(stdout),
+            "stderr": _decode_output(stderr),
+            "return_code": proc.returncode
         }
-    except subprocess.TimeoutExpired:
-        return {"error": "Command execution timed out"}
     except Exception as e:
         return {"error": f"Failed to execute command: {str(e)}"}
 
+# session ID -> (command, live child, last use) of interactive_system_command,
+# kept between calls so follow-up inputs reuse the process instead of forking a
+# new pty. Ordered least recently used first; children idle for longer than
+# the TTL, or beyond the size cap, are terminated
+_PEXPECT_SESSIONS: Dict[str, tuple] = {}
+_PEXPECT_SESSIONS_LOCK = threading.Lock()
+_PEXPECT_MAX_SESSIONS = 16
+_PEXPECT_SESSION_TTL = 600
+
+def _pexpect_session(session_id: str, command: str):
+    """Live child of session_id, None if there is none; raises ValueError when
+    the session runs a different command"""
+    now = time.monotonic()
+    evicted = []
+    with _PEXPECT_SESSIONS_LOCK:
+        for sid, (_, child, last_used) in list(_PEXPECT_SESSIONS.items()):
+            if now - last_used > _PEXPECT_SESSION_TTL or not child.isalive():
+                evicted.append(_PEXPECT_SESSIONS.pop(sid)[1])
+        entry = _PEXPECT_SESSIONS.pop(session_id, None)
+        if entry is not None:
+            if entry[0] != command:
+                _PEXPECT_SESSIONS[session_id] = entry
+                raise ValueError(f"Session {session_id} is running {entry[0]!r}, not {command!r}")
+            _PEXPECT_SESSIONS[session_id] = (command, entry[1], now)
+    for child in evicted:
+        child.terminate(force=True)
+    return entry[1] if entry is not None else None
+
+def _pexpect_session_put(session_id: str, command: str, child: pexpect.spawn):
+    evicted = []
+    with _PEXPECT_SESSIONS_LOCK:
+        stale = _PEXPECT_SESSIONS.pop(session_id, None)
+        if stale is not None:
+            evicted.append(stale[1])
+        _PEXPECT_SESSIONS[session_id] = (command, child, time.monotonic())
+        while len(_PEXPECT_SESSIONS) > _PEXPECT_MAX_SESSIONS:
+            evicted.append(_PEXPECT_SESSIONS.pop(next(iter(_PEXPECT_SESSIONS)))[1])
+    for stale_child in evicted:
+        stale_child.terminate(force=True)
+
+def _pexpect_session_drop(session_id: str):
+    """Forget session_id, terminating its child if it is still running"""
+    with _PEXPECT_SESSIONS_LOCK:
+        entry = _PEXPECT_SESSIONS.pop(session_id, None)
+    if entry is not None and entry[1].isalive():
+        entry[1].terminate(force=True)
+
+# Prompts that mean the child is waiting for the next input line: shells,
+# the Python REPL and input()-style "Name: " / "Continue? " questions
+_PROMPT_PATTERNS = [r'\$ $', r'# $', r'>>> ', r'[:?] $']
+
 def interactive_system_command(
     tool_context: ToolContext,
     command: str,
     inputs: Optional[List[str]] = None,
-    timeout: int = 15
+    timeout: int = 15,
+    session_id: Optional[str] = None
 ):
     """
     Interactive running system command, support input and output interaction
@@ -692,35 +968,84 @@ def interactive_system_command(
         command: System command to execute
         inputs: Content to input to command (string list, each element enter once)
         timeout: Execution timeout (seconds)
+        session_id: Keep the command running under this ID and return once it waits
+            for input; later calls with the same ID and command send their inputs to
+            the same process. Sessions idle for 10 minutes are terminated
 
     Returns:
         dict: Dictionary with execution result
     """
     SANDBOX_MODE = False
     if SANDBOX_MODE:
-        safe_commands = ['ls', 'pwd', 'echo', 'cat', 'head', 'tail', 'grep', 'find', 'python', 'python3', 'lsof']
-        if not any(cmd in command for cmd in safe_commands):
-            return {"error": "The command you executed is not allowed in sandbox mode; safe command list: " + str(safe_commands)}
+        if not _INTERACTIVE_SAFE_CMD_RE.match(command):
+            return {"error": "The command you executed is not allowed in sandbox mode; safe command list: " + str(interactive_safe_commands)}
+
+    if session_id:
+        try:
+            child = _pexpect_session(session_id, command)
+        except ValueError as e:
+            return {"error": str(e), "session_id": session_id}
+    else:
+        child = None
 
     try:
-        logger.info(f"Interactive executing system command: {command}")
-        child = pexpect.spawn(command, cwd=WORKSPACE_DIR, timeout=timeout, encoding='utf-8')
-        output = ""
+        # A reused child already showed its prompt at the end of the last call
+        at_prompt = child is not None and child.isalive()
+        if not at_prompt:
+            logger.info(f"Interactive executing system command: {command}")
+            child = pexpect.spawn(command, cwd=WORKSPACE_DIR, timeout=timeout, encoding='utf-8')
+            if session_id:
+                _pexpect_session_put(session_id, command, child)
+        # Compiled per child, then reused by every expect on it
+        prompts = child.compile_pattern_list(_PROMPT_PATTERNS + [pexpect.EOF, pexpect.TIMEOUT])
+        eof_index = len(_PROMPT_PATTERNS)
+        output = []
+        finished = False
+
+        def collect(index):
+            output.append(child.before)
+            if index < eof_index:
+                output.append(child.after)
+
         if inputs:
             for inp in inputs:
-                child.expect([pexpect.TIMEOUT, pexpect.EOF], timeout=1)
+                if not at_prompt:
+                    # Returns as soon as a prompt shows; the 1 s timeout only
+                    # applies to programs whose prompt none of the patterns match
+                    index = child.expect_list(prompts, timeout=1)
+                    collect(index)
+                    if index == eof_index:
+                        finished = True
+                        break
+                at_prompt = False
                 child.sendline(inp)
-        child.expect(pexpect.EOF)
-        output = child.before
-        return_code = child.exitstatus
-        return {
-            "stdout": output,
+        if not finished:
+            if session_id:
+                index = child.expect_list(prompts, timeout=timeout)
+                collect(index)
+                finished = index == eof_index
+            else:
+                child.expect(pexpect.EOF)
+                output.append(child.before)
+                finished = True
+        if finished:
+            child.close()
+            if session_id:
+                _pexpect_session_drop(session_id)
+        result = {
+            "stdout": "".join(output),
             "stderr": "", 
-            "return_code": return_code
+            "return_code": child.exitstatus if finished else None
         }
+        if session_id:
+            result["session_id"] = session_id
+            result["finished"] = finished
+        return result
     except pexpect.TIMEOUT:
         return {"error": "Command execution timed out"}
     except Exception as e:
+        if session_id:
+            _pexpect_session_drop(session_id)
         return {"error": f"Failed to execute interactive command: {str(e)}"}
 
 def run_interactive_python_code(tool_context: ToolContext, cmd: str, session_id: Optional[str] = None, user_input: Optional[str] = None, timeout: int = 30):
@@ -806,8 +1131,7 @@ def run_interactive_shell(tool_context: ToolContext, session_id: Optional[str] =
 
     # Check the safety of the command
     if SANDBOX_MODE and is_in_python and user_input:
-        current_command = user_input.split()[0] if user_input else ''
-        if not any(cmd in current_command for cmd in safe_commands):
+        if not _SAFE_CMD_RE.match(user_input):
             return {"error": "The command you executed is not allowed in sandbox mode; safe command list: " + str(safe_commands)}
     
     # Update the state of the Python environment
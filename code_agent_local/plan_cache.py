@@ -0,0 +1,136 @@
+"""
+Plan Cache for the Local Code Agent
+Learns which tool call usually follows another (a 2-gram over tool calls) and,
+when the prediction is confident enough, answers the model turn with that
+tool call directly instead of asking the LLM
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Session-state key holding the last executed (tool_name, args_hash); the
+# "temp:" prefix keeps it out of persisted session state
+_PREV_CALL_KEY = "temp:plan_cache_prev"
+# (tool_name, args_hash) of the call before_model_callback replayed instead of
+# asking the model; that call is not counted, or replays would reinforce themselves
+_REPLAYED_CALL_KEY = "temp:plan_cache_replayed"
+
+# Tools that must always be decided by the model
+_NEVER_PREDICT = frozenset(("exit_loop",))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    prev_tool TEXT NOT NULL,
+    prev_arg_hash TEXT NOT NULL,
+    next_tool TEXT NOT NULL,
+    next_args TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (prev_tool, prev_arg_hash, next_tool, next_args)
+)
+"""
+
+
+def _args_json(args: Dict[str, Any]) -> str:
+    return json.dumps(args or {}, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def _args_hash(args: Dict[str, Any]) -> str:
+    return hashlib.sha1(_args_json(args).encode()).hexdigest()
+
+
+class PlanCache:
+    """
+    sqlite-backed table of (prev_tool, prev_arg_hash) -> (next_tool, next_args, count)
+    """
+
+    def __init__(self, db_path: str, threshold: float = 0.9, min_support: int = 5):
+        self.threshold = threshold
+        self.min_support = min_support
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def record(self, prev_tool: str, prev_arg_hash: str, next_tool: str, next_args: Dict[str, Any]):
+        """Count one observed transition"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO transitions (prev_tool, prev_arg_hash, next_tool, next_args, count) "
+                "VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT (prev_tool, prev_arg_hash, next_tool, next_args) DO UPDATE SET count = count + 1",
+                (prev_tool, prev_arg_hash, next_tool, _args_json(next_args)),
+            )
+            self._conn.commit()
+
+    def predict(self, prev_tool: str, prev_arg_hash: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return the (next_tool, next_args) successor if it is confident enough"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT next_tool, next_args, count FROM transitions "
+                "WHERE prev_tool = ? AND prev_arg_hash = ? ORDER BY count DESC",
+                (prev_tool, prev_arg_hash),
+            ).fetchall()
+        if not rows:
+            return None
+        total = sum(row[2] for row in rows)
+        next_tool, next_args, count = rows[0]
+        if total < self.min_support or count / total < self.threshold:
+            return None
+        if next_tool in _NEVER_PREDICT:
+            return None
+        return next_tool, json.loads(next_args)
+
+    # ADK callbacks
+
+    def after_tool_callback(self, tool, args: Dict[str, Any], tool_context, tool_response) -> Optional[dict]:
+        """Record the transition from the previous tool call to this one"""
+        try:
+            call = [tool.name, _args_hash(args)]
+            prev = tool_context.state.get(_PREV_CALL_KEY)
+            replayed = tool_context.state.get(_REPLAYED_CALL_KEY)
+            if replayed:
+                tool_context.state[_REPLAYED_CALL_KEY] = None
+            if prev and replayed != call:
+                self.record(prev[0], prev[1], tool.name, args)
+            tool_context.state[_PREV_CALL_KEY] = call
+        except Exception as e:
+            logger.warning("Plan cache failed to record transition: %s", e)
+        return None
+
+    def before_model_callback(self, callback_context, llm_request):
+        """Short-circuit the model turn that follows a tool result with a confident prediction"""
+        contents = llm_request.contents
+        if not contents or not any(part.function_response for part in contents[-1].parts or ()):
+            return None
+        prev = callback_context.state.get(_PREV_CALL_KEY)
+        if not prev:
+            return None
+        try:
+            prediction = self.predict(prev[0], prev[1])
+        except Exception as e:
+            logger.warning("Plan cache lookup failed: %s", e)
+            return None
+        if prediction is None:
+            return None
+
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        next_tool, next_args = prediction
+        # Only replay tools the agent still offers on this request
+        if next_tool not in (getattr(llm_request, 'tools_dict', None) or {}):
+            return None
+        logger.info("Plan cache hit: %s -> %s", prev[0], next_tool)
+        callback_context.state[_REPLAYED_CALL_KEY] = [next_tool, _args_hash(next_args)]
+        return LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[types.Part.from_function_call(name=next_tool, args=next_args)],
+            )
+        )
@@ -70,10 +70,6 @@ start_mcp_servers() {
         print_warning "port 8001 is occupied, maybe MCP servers are running"
     fi
     
-    if lsof -Pi :8002 -sTCP:LISTEN -t >/dev/null ; then
-        print_warning "port 8002 is occupied, maybe MCP servers are running"
-    fi
-    
     # start MCP servers (background running)
     python3 mcp_servers.py &
     MCP_PID=$!
@@ -89,8 +85,8 @@ start_mcp_servers() {
         exit 1
     fi
     
-    if curl -s http://localhost:8002/file-operations/health > /dev/null; then
-        print_success "file operations MCP server started successfully (port 8002)"
+    if curl -s http://localhost:8001/file-operations/health > /dev/null; then
+        print_success "file operations MCP server started successfully (port 8001)"
     else
         print_error "file operations MCP server started failed"
         exit 1
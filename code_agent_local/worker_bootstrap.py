@@ -0,0 +1,93 @@
+"""
+Bootstrap source of the persistent Python interpreters used by mcp_tools'
+execute_python_code and mcp_servers' PythonInterpreterMCP pool.
+
+Requests arrive on stdin as b"<length>\n<utf-8 code>", each snippet runs in a
+fresh namespace, and the result goes back on stdout as b"<length>\n<json>".
+The protocol streams are private duplicates; while a snippet runs, fds 1/2
+point at per-run files that become its stdout/stderr, and between runs they
+point at /dev/null, so nothing the snippet writes can corrupt the framing.
+After each snippet the worker puts back cwd, os.environ, sys.path and the
+workspace modules in sys.modules, so edited workspace modules are re-imported
+and one run's setup doesn't leak into the next.
+
+Run it with ``python -c WORKER_BOOTSTRAP``.
+"""
+
+WORKER_BOOTSTRAP = r"""
+import io, json, os, sys, tempfile, traceback
+_proto_in = os.fdopen(os.dup(0), 'rb')
+_proto_out = os.fdopen(os.dup(1), 'wb')
+_null = os.open(os.devnull, os.O_RDWR)
+for _fd in (0, 1, 2):
+    os.dup2(_null, _fd)
+_cwd = os.getcwd()
+_cwd_prefix = os.path.join(os.path.realpath(_cwd), '')
+_prefix = os.path.join(os.path.realpath(sys.prefix), '')
+_environ = dict(os.environ)
+_path = list(sys.path)
+_modules = set(sys.modules)
+
+def _is_workspace_module(module):
+    # Only modules loaded from workspace sources are dropped; installed packages,
+    # C extensions in particular, can't be imported a second time
+    file = getattr(module, '__file__', None)
+    if not file:
+        return False
+    file = os.path.realpath(file)
+    return (file.startswith(_cwd_prefix) and not file.startswith(_prefix)
+            and 'site-packages' not in file.split(os.sep))
+
+def _read(f):
+    f.seek(0)
+    return f.read().decode('utf-8', errors='replace')
+
+while True:
+    header = _proto_in.readline()
+    if not header:
+        break
+    code = _proto_in.read(int(header)).decode('utf-8')
+    return_code = 0
+    # Point fds 1 and 2 at per-run files so output written below the sys.stdout
+    # level (os.system, child processes, C code) is captured too; files rather
+    # than pipes, so a chatty snippet can't block on a full pipe
+    out_file, err_file = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+    os.dup2(out_file.fileno(), 1)
+    os.dup2(err_file.fileno(), 2)
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, 'w', closefd=False), encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, 'w', closefd=False), encoding='utf-8',
+                                  errors='backslashreplace', line_buffering=True)
+    try:
+        exec(compile(code, '<stdin>', 'exec'), {'__name__': '__main__', '__file__': '<stdin>'})
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            return_code = 1
+    except BaseException as e:
+        # Skip the bootstrap frame so tracebacks look like a plain script run
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return_code = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    os.dup2(_null, 1)
+    os.dup2(_null, 2)
+    stdout, stderr = _read(out_file), _read(err_file)
+    out_file.close()
+    err_file.close()
+    os.chdir(_cwd)
+    os.environ.clear()
+    os.environ.update(_environ)
+    sys.path[:] = _path
+    for name in set(sys.modules) - _modules:
+        if _is_workspace_module(sys.modules[name]):
+            del sys.modules[name]
+    payload = json.dumps({'stdout': stdout, 'stderr': stderr, 'return_code': return_code}).encode()
+    _proto_out.write(b'%d\n' % len(payload) + payload)
+    _proto_out.flush()
+"""
@@ -1,4 +1,6 @@
 import asyncio
+import logging
+from collections import OrderedDict
 from typing import AsyncGenerator, Dict, Optional
 from pydantic import Field
 from google.adk.models.lite_llm import LiteLlm
@@ -11,6 +13,8 @@ import threading
 import hashlib
 import time
 
+logger = logging.getLogger(__name__)
+
 current_time = lambda: int(time.time())
 
 
@@ -489,4 +493,86 @@ The structure MUST be as follows:
             return
 
 
- 
\ No newline at end of file
+ 
+
+
+class CachingLiteLlm(LiteLlmWithSleep):
+    """
+    LiteLlmWithSleep with an exact-match response cache.
+
+    Identical requests (same model, contents and config) are answered from
+    memory instead of another round-trip to the provider. Requests carrying
+    tool results are never cached, since their answer depends on side effects
+    outside the prompt.
+    """
+
+    enable_response_cache: bool = Field(default=True, description="Whether to cache responses for identical requests")
+    cache_ttl: int = Field(default=86400, description="Lifetime of a cached response in seconds")
+    cache_max_entries: int = Field(default=256, description="Max number of cached requests")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # {request_hash: (stored_at, [LlmResponse, ...])}, oldest first
+        self._response_cache: "OrderedDict[str, tuple[int, list[LlmResponse]]]" = OrderedDict()
+
+    def _cache_key(self, llm_request: LlmRequest) -> Optional[str]:
+        """Hash the request, or return None if it must not be cached"""
+        for content in llm_request.contents:
+            for part in content.parts or ():
+                if part.function_response:
+                    return None
+        try:
+            payload = llm_request.model_dump_json(include={'contents', 'config'}, exclude_none=True)
+        except Exception:
+            return None
+        return hashlib.sha256(f"{self.model}\0{payload}".encode()).hexdigest()
+
+    def _get_cached_responses(self, key: str) -> Optional[list[LlmResponse]]:
+        with self._lock:
+            entry = self._response_cache.get(key)
+            if entry is None:
+                return None
+            stored_at, responses = entry
+            if current_time() - stored_at > self.cache_ttl:
+                del self._response_cache[key]
+                return None
+            self._response_cache.move_to_end(key)
+            return responses
+
+    def _store_responses(self, key: str, responses: list[LlmResponse]):
+        with self._lock:
+            self._response_cache[key] = (current_time(), responses)
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > self.cache_max_entries:
+                self._response_cache.popitem(last=False)
+
+    def clear_response_cache(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._response_cache.clear()
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Serve identical requests from the cache, otherwise defer to LiteLlmWithSleep"""
+        key = None
+        if self.enable_response_cache and not stream:
+            # Early-stopped sessions must still get their exit response
+            if not self._get_session_early_stop(self._get_session_id(llm_request)):
+                key = self._cache_key(llm_request)
+
+        if key is not None:
+            cached = self._get_cached_responses(key)
+            if cached is not None:
+                logger.info("LLM response cache hit")
+                for response in cached:
+                    yield response.model_copy(deep=True)
+                return
+
+        responses = []
+        async for response in super().generate_content_async(llm_request, stream):
+            responses.append(response)
+            yield response
+
+        if key is not None and responses and not any(r.error_code for r in responses):
+            self._store_responses(key, [r.model_copy(deep=True) for r in responses])
@@ -4,18 +4,67 @@ MinimalCodeAgent Client Script
 A simple script to send prompts to the MinimalCodeAgent and receive responses.
 """
 
-import requests
+# requests, urllib3, asyncio and aiohttp are imported where they are used, so
+# --help and argument errors don't pay for loading them
 import json
 import os
+import sys
 import argparse
+import tempfile
 import time
-from datetime import datetime
+import uuid
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to ujson or the stdlib json module
+    orjson = None
+ujson = None
+if orjson is None:
+    try:
+        import ujson
+    except ImportError:
+        pass
+
+if orjson is not None:
+    _json_loads = orjson.loads
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    _JSONDecodeError = json.JSONDecodeError
+elif ujson is not None:
+    _json_loads = ujson.loads
+    # Older ujson releases raise a plain ValueError
+    _JSONDecodeError = getattr(ujson, "JSONDecodeError", ValueError)
+else:
+    _json_loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+
+try:
+    import ijson
+except ImportError:  # ijson is optional, the /run reply is then buffered and parsed in one go
+    ijson = None
+try:
+    import cbor2
+except ImportError:  # cbor2 is only needed for --binary
+    cbor2 = None
+# ijson's errors don't derive from ValueError
+_IncrementalJSONError = ijson.JSONError if ijson is not None else _JSONDecodeError
+_CBORDecodeError = cbor2.CBORDecodeError if cbor2 is not None else _JSONDecodeError
+
+def _json_dumps(data, indent=False):
+    """Serialize data to UTF-8 JSON bytes, optionally indented by 2 spaces"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS if indent else 0)
+    if ujson is not None:
+        return ujson.dumps(data, indent=2 if indent else 0, ensure_ascii=False,
+                           escape_forward_slashes=False).encode('utf-8')
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
 
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="MinimalCodeAgent Client Script")
-    parser.add_argument("--prompt", "-p", type=str, required=True, 
+    prompt_group = parser.add_mutually_exclusive_group(required=True)
+    prompt_group.add_argument("--prompt", "-p", type=str,
                        help="The prompt to send to the code agent")
+    prompt_group.add_argument("--prompt-file", type=str,
+                       help="File with one prompt per line; each runs concurrently in its own session")
     parser.add_argument("--workdir", "-w", type=str, default=None,
                        help="Working directory for the code agent (optional)")
     parser.add_argument("--port", type=int, default=8080,
@@ -24,8 +73,13 @@ def parse_arguments():
                        help="Agent name to use (default: code_agent_local)")
     parser.add_argument("--session-id", "-s", type=str, default=None,
                        help="Session ID (if not provided, generates one)")
+    parser.add_argument("--reset-session", action=argparse.BooleanOptionalAction, default=None,
+                       help="Delete any existing session with this ID before creating it "
+                            "(default: only when --session-id is given)")
     parser.add_argument("--output", "-o", type=str, default=None,
                        help="Output file to save the response (optional)")
+    parser.add_argument("--binary", action="store_true",
+                       help="Ask the server for a CBOR response instead of JSON, if it supports it (needs cbor2)")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="Enable verbose output")
     
@@ -33,96 +87,344 @@ def parse_arguments():
 
 def generate_session_id():
     """Generate a unique session ID"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"session_{timestamp}"
+    # Random rather than timestamped, so runs started in the same second never collide
+    return f"session_{uuid.uuid4().hex}"
+
+# (connect, read) timeouts in seconds
+SESSION_TIMEOUT = (5, 10)
+QUERY_TIMEOUT = (5, 3600)  # 1 hour read timeout for long-running tasks (matches MAX_SESSION_TIME)
 
-def create_session(port, model_name, session_id, verbose=False):
-    """Create a new session with the ADK API server"""
-    session_url = f"http://localhost:{port}/apps/code_agent_local/users/{model_name}/sessions/{session_id}"
+def create_http_session():
+    """Create the HTTP session shared by all requests to the ADK API server"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     
-    if verbose:
-        print(f"Creating session: {session_url}")
+    # A /run that reached the server may already have started the agent, so
+    # only failed connections are retried there
+    query_retry = Retry(total=3, connect=3, read=0, status=0, other=0, backoff_factor=0.5)
     
-    try:
-        # Delete existing session if it exists
-        delete_response = requests.delete(session_url, timeout=10)
-        if verbose and delete_response.status_code == 200:
-            print(f"Deleted existing session: {delete_response.status_code}")
+    class SessionRetry(Retry):
+        """Retry policy of the shared adapter that switches /run over to query_retry"""
+        def increment(self, method=None, url=None, *args, **kwargs):
+            if url is not None and url.split('?', 1)[0].endswith('/run'):
+                return query_retry.increment(method, url, *args, **kwargs)
+            return super().increment(method, url, *args, **kwargs)
+    
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+    # Session management is cheap to repeat: retry network errors and 5xx with
+    # exponential backoff, and give up on 4xx at once
+    session_retry = SessionRetry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["POST", "DELETE"]),
+        raise_on_status=False,
+    )
+    # One adapter, so the session calls and /run share a single keep-alive pool;
+    # only a handful of connections to one local server are ever needed
+    session.mount("http://localhost", HTTPAdapter(max_retries=session_retry, pool_connections=4, pool_maxsize=4))
+    return session
+
+def _log_request(response):
+    """Print one line of method, URL, status, elapsed time and attempts for verbose output"""
+    retries = getattr(response.raw, 'retries', None)
+    attempts = len(retries.history) + 1 if retries is not None else 1
+    print(f"{response.request.method} {response.url} -> {response.status_code} "
+          f"in {response.elapsed.total_seconds():.2f}s (attempt {attempts})")
+
+# Accept header for --binary: CBOR preferred, JSON still acceptable
+_BINARY_ACCEPT = {"Accept": "application/cbor, application/json;q=0.5"}
+
+_PROMPT_PLACEHOLDER = "\x00prompt\x00"
+
+# Verbose mode shows at most this many bytes of a response body
+_PREVIEW_BYTES = 2048
+
+def _preview(raw):
+    """Size and leading bytes of a response body, decoded as UTF-8 without charset detection"""
+    text = raw[:_PREVIEW_BYTES].decode('utf-8', errors='replace')
+    return f"({len(raw)} bytes) {text}{'...' if len(raw) > _PREVIEW_BYTES else ''}"
+
+class AgentClient:
+    """Client for one session of an agent on the ADK API server"""
+    
+    def __init__(self, session, port, model_name, session_id, binary=False):
+        self.session = session
+        self.port = port
+        self.model_name = model_name
+        self.session_id = session_id
+        # Built once; every request of this client goes to one of these two URLs
+        self.session_url = f"http://localhost:{port}/apps/code_agent_local/users/{model_name}/sessions/{session_id}"
+        self.run_url = f"http://localhost:{port}/run"
+        # Ask for a CBOR reply; servers that only speak JSON still answer in JSON
+        self.binary = binary
+        # /run body with a placeholder for the prompt, split around it once
+        self._payload_parts = _json_dumps(self._query_data(_PROMPT_PLACEHOLDER)).split(
+            _json_dumps(_PROMPT_PLACEHOLDER))
+    
+    def _query_data(self, prompt):
+        return {
+            "appName": "code_agent_local",
+            "userId": self.model_name,
+            "sessionId": self.session_id,
+            "newMessage": {
+                "role": "user",
+                "parts": [{
+                    "text": prompt
+                }]
+            }
+        }
+    
+    def query_body(self, prompt):
+        """Serialized /run request for prompt"""
+        # Only the prompt changes between queries, so it is spliced into the pre-serialized envelope
+        return self._payload_parts[0] + _json_dumps(prompt) + self._payload_parts[1]
+    
+    def create_session(self, force_reset=False, verbose=False):
+        """Create a new session with the ADK API server"""
+        import requests
         
-        # Create new session
-        response = requests.post(session_url, timeout=10)
+        session = self.session
+        session_url = self.session_url
         
         if verbose:
-            print(f"Session creation response: {response.status_code}")
-            print(f"Session creation content: {response.text}")
+            print(f"Creating session: {session_url}")
         
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to create session, status code: {response.status_code}")
+        try:
+            # Delete existing session if it exists; a generated ID is new, so this is skipped for it
+            if force_reset:
+                delete_response = session.delete(session_url, timeout=SESSION_TIMEOUT)
+                if verbose:
+                    _log_request(delete_response)
+                    if delete_response.status_code == 200:
+                        print(f"Deleted existing session: {delete_response.status_code}")
+            
+            # Create new session
+            response = session.post(session_url, timeout=SESSION_TIMEOUT)
+            
+            if verbose:
+                _log_request(response)
+                print(f"Session creation response: {response.status_code}")
+                print(f"Session creation content: {_preview(response.content)}")
+            
+            if response.status_code == 200:
+                return _json_loads(response.content)
+            else:
+                print(f"Failed to create session, status code: {response.status_code}")
+                return None
+                
+        except requests.exceptions.RequestException as e:
+            print(f"Network error during session creation: {e}")
+            return None
+        except _JSONDecodeError as e:
+            print(f"JSON decode error during session creation: {e}")
             return None
+
+    def send_query(self, prompt, verbose=False):
+        """Send a query to the ADK API server"""
+        import requests
+        import urllib3
+        
+        session = self.session
+        query_url = self.run_url
+        
+        body = self.query_body(prompt)
+        
+        if verbose:
+            print(f"Sending query to: {query_url}")
+            # A digest rather than the whole payload: a large prompt would otherwise be serialized twice
+            print(f"Query data: {len(body)}-byte body, {len(prompt)}-char prompt, "
+                  f"app=code_agent_local, user={self.model_name}, session={self.session_id}")
+        
+        try:
+            response = session.post(
+                query_url, 
+                data=body,
+                headers=_BINARY_ACCEPT if self.binary else None,
+                timeout=QUERY_TIMEOUT,
+                stream=True
+            )
             
-    except requests.exceptions.RequestException as e:
-        print(f"Network error during session creation: {e}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error during session creation: {e}")
-        return None
+            with response:
+                if verbose:
+                    _log_request(response)
+                    print(f"Query response status: {response.status_code}")
+                    print(f"Query response content: {_preview(response.content)}")
+                
+                if response.status_code == 200:
+                    if self.binary and response.headers.get("Content-Type", "").startswith("application/cbor"):
+                        return cbor2.loads(response.content)
+                    if ijson is not None and not verbose:
+                        # Parse while the body arrives, so the raw reply is never held in memory
+                        response.raw.decode_content = True
+                        return next(ijson.items(response.raw, '', use_float=True))
+                    return _json_loads(response.content)
+                else:
+                    print(f"Query failed, status code: {response.status_code}")
+                    return None
+                
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+            # Reading response.raw directly raises urllib3's errors rather than requests'
+            print(f"Network error during query: {e}")
+            return None
+        except (_JSONDecodeError, _IncrementalJSONError) as e:
+            print(f"JSON decode error during query: {e}")
+            return None
+        except _CBORDecodeError as e:
+            print(f"CBOR decode error during query: {e}")
+            return None
 
-def send_query(port, model_name, session_id, prompt, verbose=False):
-    """Send a query to the ADK API server"""
-    query_url = f"http://localhost:{port}/run"
-    
-    query_data = {
-        "appName": "code_agent_local",
-        "userId": model_name,
-        "sessionId": session_id,
-        "newMessage": {
-            "role": "user",
-            "parts": [{
-                "text": prompt
-            }]
-        }
-    }
+async def _arun_one(http, client, prompt, force_reset=False, verbose=False):
+    """Create the client's session and run prompt in it using aiohttp"""
+    import asyncio
+    import aiohttp
     
-    if verbose:
-        print(f"Sending query to: {query_url}")
-        print(f"Query data: {json.dumps(query_data, indent=2)}")
+    session_url = client.session_url
+    query_url = client.run_url
+    session_timeout = aiohttp.ClientTimeout(total=10)
     
     try:
-        response = requests.post(
-            query_url, 
-            json=query_data,
-            timeout=3600  # 1 hour timeout for long-running tasks (matches MAX_SESSION_TIME)
-        )
+        if force_reset:
+            async with http.delete(session_url, timeout=session_timeout):
+                pass
         
-        if verbose:
-            print(f"Query response status: {response.status_code}")
-            print(f"Query response content: {response.text}")
+        async with http.post(session_url, timeout=session_timeout) as response:
+            if response.status != 200:
+                print(f"Failed to create session {client.session_id}, status code: {response.status}")
+                return None
         
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Query failed, status code: {response.status_code}")
-            return None
+        async with http.post(query_url, data=client.query_body(prompt)) as response:
+            if verbose:
+                print(f"Query response status ({client.session_id}): {response.status}")
+            if response.status != 200:
+                print(f"Query failed in session {client.session_id}, status code: {response.status}")
+                return None
+            return _json_loads(await response.read())
             
-    except requests.exceptions.RequestException as e:
-        print(f"Network error during query: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Network error during query in session {client.session_id}: {e}")
         return None
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error during query: {e}")
+    except _JSONDecodeError as e:
+        print(f"JSON decode error during query in session {client.session_id}: {e}")
         return None
 
+async def arun(port, model_name, session_ids, prompts, force_reset=False, verbose=False):
+    """Run each prompt in its own session, all in flight at once over one aiohttp connection pool"""
+    import asyncio
+    import aiohttp
+    
+    headers = {"Content-Type": "application/json", "Accept": "application/json"}
+    timeout = aiohttp.ClientTimeout(total=3600)  # matches MAX_SESSION_TIME, like send_query
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout) as http:
+        return await asyncio.gather(*(
+            _arun_one(http, AgentClient(http, port, model_name, sid), prompt, force_reset, verbose)
+            for sid, prompt in zip(session_ids, prompts)
+        ))
+
+def display_response(query_response):
+    """Print the text of an agent response"""
+    # Write encoded bytes straight to the binary stdout buffer, so large
+    # outputs skip print()'s per-call text layer; earlier print() output
+    # is flushed first to keep the order
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    write = out.write
+    
+    # Extract and display the response text
+    if 'response' in query_response:
+        response_text = query_response['response']
+        if isinstance(response_text, dict) and 'parts' in response_text:
+            for part in response_text['parts']:
+                if 'text' in part:
+                    write(part['text'].encode('utf-8'))
+                    write(b'\n')
+        elif isinstance(response_text, str):
+            write(response_text.encode('utf-8'))
+            write(b'\n')
+        else:
+            write(_json_dumps(response_text, indent=True))
+            write(b'\n')
+    else:
+        write(_json_dumps(query_response, indent=True))
+        write(b'\n')
+    out.flush()
+
+def run_prompt_file(args, agent_name, session_id, force_reset):
+    """Send every prompt of --prompt-file concurrently, one session per prompt"""
+    import asyncio
+    try:
+        import aiohttp  # only checked here, arun uses it
+    except ImportError:
+        print("Error: --prompt-file requires aiohttp (pip install aiohttp)")
+        return 1
+    
+    try:
+        with open(args.prompt_file, encoding='utf-8') as f:
+            prompts = [line.rstrip('\n') for line in f if line.strip()]
+    except OSError as e:
+        print(f"Error reading prompt file: {e}")
+        return 1
+    if not prompts:
+        print("Error: prompt file contains no prompts")
+        return 1
+    session_ids = [f"{session_id}_{i}" for i in range(len(prompts))]
+    
+    print(f"Sending {len(prompts)} queries to agent...")
+    start_time = time.time()
+    responses = asyncio.run(arun(args.port, agent_name, session_ids, prompts, force_reset, args.verbose))
+    end_time = time.time()
+    
+    failed = sum(1 for r in responses if not r)
+    print(f"✅ {len(prompts) - failed}/{len(prompts)} queries completed in {end_time - start_time:.2f} seconds")
+    
+    for sid, prompt, query_response in zip(session_ids, prompts, responses):
+        print("\n" + "="*50)
+        print(f"🤖 AGENT RESPONSE ({sid}): {prompt[:100]}{'...' if len(prompt) > 100 else ''}")
+        print("="*50)
+        if query_response:
+            display_response(query_response)
+        else:
+            print("❌ Failed to send query")
+    
+    # Save responses if requested, in prompt order
+    if args.output:
+        save_response(responses, args.output, args.verbose)
+    
+    if failed:
+        print(f"\n❌ {failed} queries failed")
+        return 1
+    print("\n✅ Interaction completed successfully!")
+    return 0
+
 def save_response(response_data, output_file, verbose=False):
     """Save response to file"""
     if output_file:
+        # Written to a uniquely named temporary file in the target directory
+        # and renamed, so an interrupted save never leaves a truncated output
+        # file behind and concurrent saves never share a temp file
+        tmp_file = None
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(response_data, f, indent=2, ensure_ascii=False)
+            data = _json_dumps(response_data, indent=True)
+            with tempfile.NamedTemporaryFile(
+                'wb', dir=os.path.dirname(os.path.abspath(output_file)),
+                prefix='.' + os.path.basename(output_file) + '.', delete=False,
+            ) as f:
+                tmp_file = f.name
+                # NamedTemporaryFile is created 0600; match a plain open()
+                os.fchmod(f.fileno(), 0o644)
+                f.write(data)
+            os.replace(tmp_file, output_file)
             if verbose:
                 print(f"Response saved to: {output_file}")
         except Exception as e:
             print(f"Error saving response to file: {e}")
+            if tmp_file is not None:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
 
 def main():
     """Main function"""
@@ -144,16 +446,32 @@ def main():
             print(f"Working directory set to: {os.environ['CODE_AGENT_WORKSPACE_DIR']}")
     
     print(f"🚀 Starting MinimalCodeAgent interaction")
-    print(f"📝 Prompt: {args.prompt[:100]}{'...' if len(args.prompt) > 100 else ''}")
+    if args.prompt_file:
+        print(f"📝 Prompt file: {args.prompt_file}")
+    elif args.verbose:
+        # The prompt is the user's own input, so the preview is only shown on request
+        print(f"📝 Prompt: {args.prompt[:100]}{'...' if len(args.prompt) > 100 else ''}")
     print(f"🤖 Agent Name: {agent_name}")
     print(f"📁 Working directory: {os.environ.get('CODE_AGENT_WORKSPACE_DIR', 'default')}")
     print(f"🔗 Session ID: {session_id}")
     print(f"🌐 API Server: http://localhost:{args.port}")
     print("-" * 50)
     
+    # User-supplied IDs may already exist on the server
+    force_reset = args.reset_session if args.reset_session is not None else args.session_id is not None
+    
+    if args.prompt_file:
+        return run_prompt_file(args, agent_name, session_id, force_reset)
+    
+    # One HTTP session for every request, so the connection is kept alive between them
+    if args.binary and cbor2 is None:
+        print("Error: --binary requires cbor2 (pip install cbor2)")
+        return 1
+    client = AgentClient(create_http_session(), args.port, agent_name, session_id, args.binary)
+    
     # Create session
     print("Creating session...")
-    session_response = create_session(args.port, agent_name, session_id, args.verbose)
+    session_response = client.create_session(force_reset, args.verbose)
     if not session_response:
         print("❌ Failed to create session")
         return 1
@@ -163,7 +481,7 @@ def main():
     # Send query
     print("Sending query to agent...")
     start_time = time.time()
-    query_response = send_query(args.port, agent_name, session_id, args.prompt, args.verbose)
+    query_response = client.send_query(args.prompt, args.verbose)
     end_time = time.time()
     
     if not query_response:
@@ -177,19 +495,7 @@ def main():
     print("🤖 AGENT RESPONSE:")
     print("="*50)
     
-    # Extract and display the response text
-    if 'response' in query_response:
-        response_text = query_response['response']
-        if isinstance(response_text, dict) and 'parts' in response_text:
-            for part in response_text['parts']:
-                if 'text' in part:
-                    print(part['text'])
-        elif isinstance(response_text, str):
-            print(response_text)
-        else:
-            print(json.dumps(response_text, indent=2, ensure_ascii=False))
-    else:
-        print(json.dumps(query_response, indent=2, ensure_ascii=False))
+    display_response(query_response)
     
     # Save response if requested
     if args.output: